@@ -1,5 +1,43 @@
+import threading
+import time
 from abc import ABC, abstractmethod
-from pandas import DataFrame
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+from weakref import WeakKeyDictionary
+
+import numpy as np
+from pandas import CategoricalDtype, DataFrame, Series, concat
+
+# Número máximo de bibliotecas enviadas en cada consulta parametrizada con $ids
+QUERY_BATCH_SIZE = 10_000
+# Registros pedidos al servidor en cada mensaje Bolt; una consulta por lote de ids
+# devuelve hasta QUERY_BATCH_SIZE filas, que así llegan en un solo mensaje
+QUERY_FETCH_SIZE = 10_000
+# Consultas guardadas por driver en run_query y segundos que se reutilizan
+QUERY_CACHE_SIZE = 64
+QUERY_CACHE_TTL = 600
+
+_QUERY_CACHE: "WeakKeyDictionary[object, OrderedDict]" = WeakKeyDictionary()
+_QUERY_CACHE_LOCK = threading.Lock()
+
+# Respuestas posibles como tipo categórico y puntaje de cada código de categoría
+ScoreTable = Tuple[CategoricalDtype, np.ndarray]
+
+
+def score_table(scores: dict) -> ScoreTable:
+    """
+    Precompila un diccionario respuesta -> puntaje para AnalysisCoordinate.map_scores.
+    El arreglo de puntajes termina en NaN, de modo que el código -1 (respuesta
+    faltante o fuera del diccionario) toma ese valor.
+
+    Args:
+        scores (dict): Puntaje de cada respuesta.
+
+    Returns:
+        ScoreTable: Tipo categórico con las respuestas y puntajes por código.
+    """
+    puntajes = np.array(list(scores.values()), dtype=float)
+    return CategoricalDtype(list(scores)), np.append(puntajes, np.nan)
 
 
 class AnalysisCoordinate(ABC):
@@ -18,11 +56,194 @@ class AnalysisCoordinate(ABC):
         self.column_name = column_name
         self.description = description
         self.score = None
+        # Resultado de cypher() ya consultado por el transformador, si lo hay
+        self.prefetched: Optional[DataFrame] = None
+        # Filas de df_encuestas de las bibliotecas a calcular (máscara booleana, o
+        # slice(None) si son todas), compartida entre coordenadas por el transformador
+        self.survey_mask: Optional[Union[Series, slice]] = None
+        # Columnas ya recortadas por survey_data: columna -> (df_encuestas, máscara, filas)
+        self._survey_slices: dict = {}
 
     @abstractmethod
-    def get_data(self) -> DataFrame:
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
         raise NotImplementedError
 
     @abstractmethod
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
         raise NotImplementedError
+
+    @classmethod
+    def cypher(cls) -> Optional[str]:
+        """
+        Consulta Cypher de la coordenada, parametrizada con $ids. Las coordenadas
+        que solo leen la encuesta devuelven None.
+        """
+        return None
+
+    def survey_data(self, bibliotecas: list[str], column: str) -> DataFrame:
+        """
+        Devuelve BibliotecaID y `column` de la encuesta para las bibliotecas dadas.
+        Reutiliza `self.survey_mask` si existe en lugar de recalcular el filtro, y
+        guarda el recorte para las siguientes llamadas con la misma encuesta y
+        máscara. Se devuelve una copia superficial: con copy-on-write, agregarle
+        columnas (p. ej. Puntaje) no altera el recorte guardado.
+
+        Args:
+            bibliotecas (list[str]): Ids de las bibliotecas a incluir.
+            column (str): Columna de la encuesta a devolver.
+
+        Returns:
+            DataFrame: Filas de la encuesta de esas bibliotecas.
+        """
+        mask = self.survey_mask
+        if mask is None:
+            mask = self.df_encuestas["BibliotecaID"].isin(bibliotecas)
+            return self.df_encuestas.loc[mask, ["BibliotecaID", column]]
+        cached = self._survey_slices.get(column)
+        if cached is None or cached[0] is not self.df_encuestas:
+            misma_mascara = False
+        elif isinstance(mask, slice) and isinstance(cached[1], slice):
+            misma_mascara = cached[1] == mask
+        else:
+            misma_mascara = cached[1] is mask
+        if not misma_mascara:
+            filas = self.df_encuestas.loc[mask, ["BibliotecaID", column]]
+            cached = self._survey_slices[column] = (self.df_encuestas, mask, filas)
+        return cached[2].copy(deep=False)
+
+    @staticmethod
+    def map_scores(values: Series, table: ScoreTable) -> Series:
+        """
+        Asigna a cada respuesta su puntaje según una tabla de score_table; las
+        respuestas sin puntaje quedan en NaN, igual que con Series.map. Las
+        respuestas se convierten a los códigos del tipo categórico de la tabla y
+        el puntaje se toma por índice. Sin respuestas faltantes, los puntajes
+        quedan como int8.
+
+        Args:
+            values (Series): Respuestas de la encuesta.
+            table (ScoreTable): Tipo categórico y puntajes de score_table.
+
+        Returns:
+            Series: Puntajes alineados con `values`.
+        """
+        dtype, puntajes_por_codigo = table
+        if isinstance(values.dtype, CategoricalDtype) and values.cat.categories.empty:
+            # Pregunta sin ninguna respuesta en estas filas: nada que puntuar
+            return Series(np.nan, index=values.index, name=values.name, dtype=float)
+        if isinstance(values.dtype, CategoricalDtype):
+            # Columna ya categórica (ver OperationalizationSource): se traducen solo
+            # sus categorías y los códigos de cada fila indexan esa traducción
+            codigos = dtype.categories.get_indexer(values.cat.categories)
+            por_categoria = np.append(puntajes_por_codigo[codigos], np.nan)
+            puntajes = por_categoria[values.cat.codes.to_numpy()]
+        else:
+            puntajes = puntajes_por_codigo[values.astype(dtype).cat.codes.to_numpy()]
+        if not np.isnan(puntajes).any():
+            puntajes = puntajes.astype(np.int8)
+        return Series(puntajes, index=values.index, name=values.name)
+
+    def run_query(
+        self, bibliotecas: list[str], batch_size: int = QUERY_BATCH_SIZE
+    ) -> DataFrame:
+        """
+        Devuelve los resultados de cypher() para las bibliotecas dadas. Usa los
+        datos precargados en `self.prefetched` si existen; si no, consulta Neo4j
+        una vez por driver, coordenada y lote de bibliotecas (ver clear_query_cache).
+
+        Args:
+            bibliotecas (list[str]): Ids de las bibliotecas a consultar.
+            batch_size (int): Cantidad máxima de ids por consulta.
+
+        Returns:
+            DataFrame: Resultados de todos los lotes.
+        """
+        if self.prefetched is not None:
+            return self.prefetched
+        # calculate_score agrega columnas al resultado; la copia protege la caché
+        return _cached_fetch(
+            self.driver, type(self), tuple(bibliotecas), batch_size
+        ).copy()
+
+    @classmethod
+    def fetch(
+        cls, runner, bibliotecas: list[str], batch_size: int = QUERY_BATCH_SIZE
+    ) -> DataFrame:
+        """
+        Ejecuta cypher() con `runner` (una sesión o una transacción), enviando los
+        ids en lotes para que cada lote sea un solo viaje a Neo4j. Cada lote se
+        convierte con Result.to_df, que arma las columnas a partir de los valores
+        de cada registro sin pasar por un diccionario por fila.
+
+        Args:
+            runner: Objeto con método run, como una sesión o transacción de Neo4j.
+            bibliotecas (list[str]): Ids de las bibliotecas a consultar.
+            batch_size (int): Cantidad máxima de ids por consulta.
+
+        Returns:
+            DataFrame: Resultados de todos los lotes.
+        """
+        query = cls.cypher()
+        ids = Series(bibliotecas, dtype=object).dropna().tolist()
+        frames = [
+            runner.run(query, ids=ids[i : i + batch_size]).to_df()
+            for i in range(0, len(ids), batch_size)
+        ]
+        if not frames:
+            return DataFrame()
+        return frames[0] if len(frames) == 1 else concat(frames, ignore_index=True)
+
+
+def cached_query(
+    driver, coordinate_cls: type, bibliotecas: tuple, batch_size: int = QUERY_BATCH_SIZE
+) -> Optional[DataFrame]:
+    """
+    Resultado guardado de coordinate_cls.fetch para estas bibliotecas, o None si no
+    está o ya venció. Cada driver guarda a lo sumo QUERY_CACHE_SIZE consultas
+    durante QUERY_CACHE_TTL segundos, y su caché desaparece junto con el driver.
+    """
+    key = (coordinate_cls, bibliotecas, batch_size)
+    with _QUERY_CACHE_LOCK:
+        cache = _QUERY_CACHE.get(driver)
+        entry = cache.get(key) if cache is not None else None
+        if entry is None or time.monotonic() - entry[0] >= QUERY_CACHE_TTL:
+            return None
+        cache.move_to_end(key)
+        return entry[1]
+
+
+def cache_query(
+    driver,
+    coordinate_cls: type,
+    bibliotecas: tuple,
+    frame: DataFrame,
+    batch_size: int = QUERY_BATCH_SIZE,
+) -> None:
+    """Guarda `frame` como resultado de coordinate_cls.fetch, ver cached_query."""
+    key = (coordinate_cls, bibliotecas, batch_size)
+    with _QUERY_CACHE_LOCK:
+        cache = _QUERY_CACHE.setdefault(driver, OrderedDict())
+        cache[key] = (time.monotonic(), frame)
+        cache.move_to_end(key)
+        while len(cache) > QUERY_CACHE_SIZE:
+            cache.popitem(last=False)
+
+
+def _cached_fetch(
+    driver, coordinate_cls: type, bibliotecas: tuple, batch_size: int
+) -> DataFrame:
+    frame = cached_query(driver, coordinate_cls, bibliotecas, batch_size)
+    if frame is None:
+        with driver.session(fetch_size=QUERY_FETCH_SIZE) as session:
+            frame = coordinate_cls.fetch(session, list(bibliotecas), batch_size)
+        cache_query(driver, coordinate_cls, bibliotecas, frame, batch_size)
+    return frame
+
+
+def clear_query_cache() -> None:
+    """
+    Olvida los resultados de consultas guardados por AnalysisCoordinate.run_query,
+    por ejemplo si el grafo cambió durante la ejecución.
+    """
+    with _QUERY_CACHE_LOCK:
+        _QUERY_CACHE.clear()
@@ -1,4 +1,4 @@
-from etl.coordinates.base import AnalysisCoordinate
+from etl.coordinates.base import AnalysisCoordinate, score_table
 from etl.utils.constants import AnalysisCategory
 from etl.utils.query_manager import Neo4JQueryManager
 from etl.utils.utils import one_hot_encode_categories, normalize_and_clean_nominal_categories
@@ -15,17 +15,28 @@ class DiversidadColeccionesCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.COLECCION_CARACTERIZACION.value
 
-    def get_data(self) -> DataFrame:
-        with self.driver.session() as session:
-            result = session.run(Neo4JQueryManager.diversidad_colecciones())
-            return DataFrame(result.data())
+    @classmethod
+    def cypher(cls) -> str:
+        return Neo4JQueryManager.diversidad_colecciones()
+
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.run_query(bibliotecas)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
+        data = self.get_data(bibliotecas)
         return data
 
 
+CANTIDAD_INVENTARIO_SCORES = score_table(
+    {
+        "de 0 a 500 materiales": 0,
+        "de 500 a 1000 materiales": 1,
+        "de 1000 a 3000 materiales": 2,
+        "Más de 3000 materiales": 3,
+    }
+)
+
+
 class CantidadMaterialBibliograficoCoordinate(AnalysisCoordinate):
     def __init__(self, driver):
         super().__init__(
@@ -36,28 +47,32 @@ class CantidadMaterialBibliograficoCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.COLECCION_CARACTERIZACION.value
 
-    def get_data(self) -> DataFrame:
-        with self.driver.session() as session:
-            result = session.run(Neo4JQueryManager.cantidad_inventario())
-            return DataFrame(result.data())
+    @classmethod
+    def cypher(cls) -> str:
+        return Neo4JQueryManager.cantidad_inventario()
+
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.run_query(bibliotecas)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
-
-        cantidad_inventario_scores = {
-            "de 0 a 500 materiales": 0,
-            "de 500 a 1000 materiales": 1,
-            "de 1000 a 3000 materiales": 2,
-            "Más de 3000 materiales": 3,
-        }
-
-        data[self.column_name] = data["cantidad_inventario"].map(
-            cantidad_inventario_scores
+        data = self.get_data(bibliotecas)
+
+        data[self.column_name] = self.map_scores(
+            data["cantidad_inventario"], CANTIDAD_INVENTARIO_SCORES
         )
         return data
 
 
+PERCEPCION_SCORES = score_table(
+    {
+        "La colección está en general en mal estado.": 0,
+        "Una parte significativa de la colección muestra signos de deterioro.": 1,
+        "La mayoría de los materiales están bien conservados, pero algunos requieren atención.": 2,
+        "La colección se encuentra en excelentes condiciones.": 3,
+    }
+)
+
+
 class PercepcionEstadoFisicoColeccionCoordinate(AnalysisCoordinate):
     def __init__(self, driver, df_encuestas):
         super().__init__(
@@ -69,19 +84,14 @@ class PercepcionEstadoFisicoColeccionCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.COLECCION_CARACTERIZACION.value
 
-    def get_data(self) -> DataFrame:
-        return self.df_encuestas[["BibliotecaID", self.column_name]]
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.survey_data(bibliotecas, self.column_name)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
-        percepcion_scores = {
-            "La colección está en general en mal estado.": 0,
-            "Una parte significativa de la colección muestra signos de deterioro.": 1,
-            "La mayoría de los materiales están bien conservados, pero algunos requieren atención.": 2,
-            "La colección se encuentra en excelentes condiciones.": 3,
-        }
-        data[self.column_name] = data[self.column_name].map(percepcion_scores)
+        data = self.get_data(bibliotecas)
+        data[self.column_name] = self.map_scores(
+            data[self.column_name], PERCEPCION_SCORES
+        )
         return data
 
 
@@ -96,12 +106,11 @@ class EnfoquesColeccionesCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.COLECCION_CARACTERIZACION.value
 
-    def get_data(self) -> DataFrame:
-        return self.df_encuestas[["BibliotecaID", self.column_name]]
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.survey_data(bibliotecas, self.column_name)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
+        data = self.get_data(bibliotecas)
         data[self.column_name] = normalize_and_clean_nominal_categories(data[self.column_name])
         return data
 
@@ -117,16 +126,25 @@ class ActividadesMediacionColeccionCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.COLECCION_CARACTERIZACION.value
 
-    def get_data(self) -> DataFrame:
-        return self.df_encuestas[["BibliotecaID", self.column_name]]
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.survey_data(bibliotecas, self.column_name)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
+        data = self.get_data(bibliotecas)
         data[self.column_name] = normalize_and_clean_nominal_categories(data[self.column_name])
         return data
 
 
+FRECUENCIA_SCORES = score_table(
+    {
+        "No aplica.": 0,
+        "Rara vez.": 1,
+        "La mayoria de las veces.": 2,  # sin tilde
+        "Siempre.": 3,
+    }
+)
+
+
 class FrecuenciaActividadesMediacionCoordinate(AnalysisCoordinate):
     def __init__(self, driver, df_encuestas):
         super().__init__(
@@ -138,19 +156,14 @@ class FrecuenciaActividadesMediacionCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.COLECCION_CARACTERIZACION.value
 
-    def get_data(self) -> DataFrame:
-        return self.df_encuestas[["BibliotecaID", self.column_name]]
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.survey_data(bibliotecas, self.column_name)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
-        frecuencia_scores = {
-            "No aplica.": 0,
-            "Rara vez.": 1,
-            "La mayoria de las veces.": 2,  # sin tilde
-            "Siempre.": 3,
-        }
-        data[self.column_name] = data[self.column_name].map(frecuencia_scores)
+        data = self.get_data(bibliotecas)
+        data[self.column_name] = self.map_scores(
+            data[self.column_name], FRECUENCIA_SCORES
+        )
         return data
 
 
@@ -165,11 +178,10 @@ class ColeccionesEspecialesCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.COLECCION_CARACTERIZACION.value
 
-    def get_data(self) -> DataFrame:
-        return self.df_encuestas[["BibliotecaID", self.column_name]]
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.survey_data(bibliotecas, self.column_name)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
+        data = self.get_data(bibliotecas)
         data[self.column_name] = normalize_and_clean_nominal_categories(data[self.column_name])
         return data
@@ -1,7 +1,8 @@
-from etl.coordinates.base import AnalysisCoordinate
+from etl.coordinates.base import AnalysisCoordinate, score_table
 from etl.utils.constants import AnalysisCategory
 from etl.utils.query_manager import Neo4JQueryManager
 
+import numpy as np
 from pandas import DataFrame
 
 
@@ -16,25 +17,36 @@ class InfraestructuraTecnologicaCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.CATALOGO_DIGITALIZACION.value
 
-    def get_data(self) -> DataFrame:
-        with self.driver.session() as session:
-            result = session.run(Neo4JQueryManager.infraestructura_tecnologica())
-            return DataFrame(result.data())
+    @classmethod
+    def cypher(cls) -> str:
+        return Neo4JQueryManager.infraestructura_tecnologica()
+
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.run_query(bibliotecas)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
-        data[self.column_name] = data.apply(
-            lambda row: (
-                2
-                if row["tieneComputador"] and row["tieneConectividad"]
-                else (1 if row["tieneComputador"] or row["tieneConectividad"] else 0)
-            ),
-            axis=1,
+        data = self.get_data(bibliotecas)
+        # Un punto por tener computador y otro por tener conectividad; los bool
+        # ocupan un byte, así que se suman como int8 sin copiar
+        tiene_computador = data["tieneComputador"].fillna(False).to_numpy(dtype=bool)
+        tiene_conectividad = (
+            data["tieneConectividad"].fillna(False).to_numpy(dtype=bool)
         )
+        puntos = tiene_computador.view(np.int8) + tiene_conectividad.view(np.int8)
+        data[self.column_name] = puntos
         return data
 
 
+CATALOG_SCORES = score_table(
+    {
+        "No tiene catálogo.": 0,
+        "Catálogo analógico.": 1,
+        "Catálogo en hoja de cálculo.": 2,
+        "Software Bibliográfico.": 3,
+    }
+)
+
+
 class EstadoDigitalizacionCatalogoCoordinate(AnalysisCoordinate):
     def __init__(self, driver, df_encuestas):
         super().__init__(
@@ -46,19 +58,12 @@ class EstadoDigitalizacionCatalogoCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.CATALOGO_DIGITALIZACION.value
 
-    def get_data(self) -> DataFrame:
-        return self.df_encuestas[["BibliotecaID", self.column_name]]
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.survey_data(bibliotecas, self.column_name)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
-        catalog_scores = {
-            "No tiene catálogo.": 0,
-            "Catálogo analógico.": 1,
-            "Catálogo en hoja de cálculo.": 2,
-            "Software Bibliográfico.": 3,
-        }
-        data[self.column_name] = data[self.column_name].map(catalog_scores)
+        data = self.get_data(bibliotecas)
+        data[self.column_name] = self.map_scores(data[self.column_name], CATALOG_SCORES)
         return data
 
 
@@ -73,16 +78,26 @@ class PorcentajeColeccionCatalogoCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.CATALOGO_DIGITALIZACION.value
 
-    def get_data(self) -> DataFrame:
-        return self.df_encuestas[["BibliotecaID", self.column_name]]
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.survey_data(bibliotecas, self.column_name)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
+        data = self.get_data(bibliotecas)
         data[self.column_name] = data[self.column_name]
         return data
 
 
+DETAIL_SCORES = score_table(
+    {
+        "Sin información": 0,
+        "Descripción del material": 1,
+        "Sistemas de Clasificación": 2,
+        "Identificadores como ISBN": 3,
+        "Estado de disponibilidad de los materiales": 4,
+    }
+)
+
+
 class NivelInformacionCatalogoCoordinate(AnalysisCoordinate):
     def __init__(self, driver, df_encuestas):
         super().__init__(
@@ -94,18 +109,10 @@ class NivelInformacionCatalogoCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.CATALOGO_DIGITALIZACION.value
 
-    def get_data(self) -> DataFrame:
-        return self.df_encuestas[["BibliotecaID", self.column_name]]
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.survey_data(bibliotecas, self.column_name)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
-        detail_scores = {
-            "Sin información": 0,
-            "Descripción del material": 1,
-            "Sistemas de Clasificación": 2,
-            "Identificadores como ISBN": 3,
-            "Estado de disponibilidad de los materiales": 4,
-        }
-        data[self.column_name] = data[self.column_name].map(detail_scores)
+        data = self.get_data(bibliotecas)
+        data[self.column_name] = self.map_scores(data[self.column_name], DETAIL_SCORES)
         return data
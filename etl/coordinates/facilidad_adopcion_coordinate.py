@@ -1,9 +1,19 @@
-from etl.coordinates.base import AnalysisCoordinate
+from etl.coordinates.base import AnalysisCoordinate, score_table
 from etl.utils.constants import AnalysisCategory
 from etl.utils.query_manager import Neo4JQueryManager
 
+import numpy as np
 from pandas import DataFrame
 
+# Límites de cada puntaje, para np.searchsorted. Menos de 25% -> 0, de 25% a 75%
+# -> 1, el resto (incluido NaN, que queda al final) -> 2; con side="right" el 75
+# entra al tramo medio porque el límite es el siguiente float después de 75
+PORCENTAJE_CATALOGADO_LIMITES = np.array([25, np.nextafter(75, np.inf)])
+# Hasta 2 servicios -> 0, de 3 a 5 -> 1, de 6 a 8 -> 2, más de 8 -> 3
+NUM_SERVICIOS_LIMITES = np.array([2, 5, 8])
+# Hasta 2 tipos -> 0, 3 o 4 -> 1, 5 o 6 -> 2, más de 6 -> 3
+NUM_TIPOS_COLECCION_LIMITES = np.array([2, 4, 6])
+
 
 # Facilidad de Adopción del Catálogo en Koha
 class PorcentajeColeccionCatalogadaCoordinate(AnalysisCoordinate):
@@ -16,25 +26,27 @@ class PorcentajeColeccionCatalogadaCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.FACILIDAD_ADOPCION_KOHA.value
 
-    def get_data(self) -> DataFrame:
-        return self.df_encuestas[["BibliotecaID", "porcentaje_catalogado"]]
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.survey_data(bibliotecas, "porcentaje_catalogado")
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
-
-        def get_score(porcentaje):
-            if porcentaje < 25:
-                return 0
-            elif 25 <= porcentaje <= 75:
-                return 1
-            else:
-                return 2
-
-        data["Puntaje"] = data["porcentaje_catalogado"].apply(get_score)
+        data = self.get_data(bibliotecas)
+        porcentaje = data["porcentaje_catalogado"].to_numpy(dtype=float)
+        data["Puntaje"] = np.searchsorted(
+            PORCENTAJE_CATALOGADO_LIMITES, porcentaje, side="right"
+        ).astype(np.int8)
         return data
 
 
+CAPACIDAD_SCORES = score_table(
+    {
+        "Sin experiencia": 0,
+        "Necesita capacitación": 1,
+        "Con experiencia previa": 2,
+    }
+)
+
+
 class CapacidadTecnicaPersonalCoordinate(AnalysisCoordinate):
     def __init__(self, driver, df_encuestas):
         super().__init__(
@@ -45,21 +57,27 @@ class CapacidadTecnicaPersonalCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.FACILIDAD_ADOPCION_KOHA.value
 
-    def get_data(self) -> DataFrame:
-        return self.df_encuestas[["BibliotecaID", "capacidad_tecnica_personal"]]
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.survey_data(bibliotecas, "capacidad_tecnica_personal")
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
-        capacidad_scores = {
-            "Sin experiencia": 0,
-            "Necesita capacitación": 1,
-            "Con experiencia previa": 2,
-        }
-        data["Puntaje"] = data["capacidad_tecnica_personal"].map(capacidad_scores)
+        data = self.get_data(bibliotecas)
+        data["Puntaje"] = self.map_scores(
+            data["capacidad_tecnica_personal"], CAPACIDAD_SCORES
+        )
         return data
 
 
+IMPACTO_SCORES = score_table(
+    {
+        "Impacto mínimo": 0,
+        "Impacto bajo": 1,
+        "Impacto moderado": 2,
+        "Impacto alto": 3,
+    }
+)
+
+
 # Impacto de Adoptar Koha
 class NivelImpactoKohaCoordinate(AnalysisCoordinate):
     def __init__(self, driver, df_encuestas):
@@ -71,19 +89,14 @@ class NivelImpactoKohaCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.IMPACTO_ADOPTAR_KOHA.value
 
-    def get_data(self) -> DataFrame:
-        return self.df_encuestas[["BibliotecaID", "nivel_impacto_adoptar_koha"]]
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.survey_data(bibliotecas, "nivel_impacto_adoptar_koha")
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
-        impacto_scores = {
-            "Impacto mínimo": 0,
-            "Impacto bajo": 1,
-            "Impacto moderado": 2,
-            "Impacto alto": 3,
-        }
-        data["Puntaje"] = data["nivel_impacto_adoptar_koha"].map(impacto_scores)
+        data = self.get_data(bibliotecas)
+        data["Puntaje"] = self.map_scores(
+            data["nivel_impacto_adoptar_koha"], IMPACTO_SCORES
+        )
         return data
 
 
@@ -96,30 +109,31 @@ class DiversidadServiciosCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.IMPACTO_ADOPTAR_KOHA.value
 
-    def get_data(self) -> DataFrame:
-        with self.driver.session() as session:
-            result = session.run(Neo4JQueryManager.diversidad_servicios())
-            return DataFrame(result.data())
+    @classmethod
+    def cypher(cls) -> str:
+        return Neo4JQueryManager.diversidad_servicios()
+
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.run_query(bibliotecas)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
-
-        def get_score(num_services):
-            if num_services <= 2:
-                return 0
-            elif 3 <= num_services <= 5:
-                return 1
-            elif 6 <= num_services <= 8:
-                return 2
-            else:
-                return 3
-
-        data["num_servicios"] = data["servicios"].apply(lambda x: len(x))
-        data["Puntaje"] = data["num_servicios"].apply(get_score)
+        data = self.get_data(bibliotecas)
+        data["Puntaje"] = np.searchsorted(
+            NUM_SERVICIOS_LIMITES, data["num_servicios"].to_numpy()
+        ).astype(np.int8)
         return data
 
 
+SOBRECARGA_SCORES = score_table(
+    {
+        "Menos de 1 hora": 0,
+        "Entre 1 y 2 horas": 1,
+        "Entre 2 y 5 horas": 2,
+        "Más de 5 horas": 3,
+    }
+)
+
+
 class SobrecargaAdministrativaCoordinate(AnalysisCoordinate):
     def __init__(self, driver, df_encuestas):
         super().__init__(
@@ -130,19 +144,14 @@ class SobrecargaAdministrativaCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.IMPACTO_ADOPTAR_KOHA.value
 
-    def get_data(self) -> DataFrame:
-        return self.df_encuestas[["BibliotecaID", "sobrecarga_admin_catalogo"]]
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.survey_data(bibliotecas, "sobrecarga_admin_catalogo")
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
-        sobrecarga_scores = {
-            "Menos de 1 hora": 0,
-            "Entre 1 y 2 horas": 1,
-            "Entre 2 y 5 horas": 2,
-            "Más de 5 horas": 3,
-        }
-        data["Puntaje"] = data["sobrecarga_admin_catalogo"].map(sobrecarga_scores)
+        data = self.get_data(bibliotecas)
+        data["Puntaje"] = self.map_scores(
+            data["sobrecarga_admin_catalogo"], SOBRECARGA_SCORES
+        )
         return data
 
 
@@ -156,25 +165,16 @@ class TiposColeccionCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.DETALLE_COLECCION_KOHA.value
 
-    def get_data(self) -> DataFrame:
-        with self.driver.session() as session:
-            result = session.run(Neo4JQueryManager.tipos_coleccion())
-            return DataFrame(result.data())
+    @classmethod
+    def cypher(cls) -> str:
+        return Neo4JQueryManager.tipos_coleccion()
+
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.run_query(bibliotecas)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
-
-        def get_score(num_tipos):
-            if num_tipos <= 2:
-                return 0
-            elif 3 <= num_tipos <= 4:
-                return 1
-            elif 5 <= num_tipos <= 6:
-                return 2
-            else:
-                return 3
-
-        data["num_tipos_coleccion"] = data["tipos_coleccion"].apply(lambda x: len(x))
-        data["Puntaje"] = data["num_tipos_coleccion"].apply(get_score)
+        data = self.get_data(bibliotecas)
+        data["Puntaje"] = np.searchsorted(
+            NUM_TIPOS_COLECCION_LIMITES, data["num_tipos_coleccion"].to_numpy()
+        ).astype(np.int8)
         return data
@@ -1,7 +1,8 @@
-from etl.coordinates.base import AnalysisCoordinate
+from etl.coordinates.base import AnalysisCoordinate, score_table
 from etl.utils.constants import AnalysisCategory
 
-from pandas import DataFrame, notnull
+import numpy as np
+from pandas import DataFrame
 
 
 # Nivel de avance en la sistematización de servicios bibliotecarios
@@ -16,28 +17,35 @@ class SistemasClasificacionCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.SISTEMATIZACION_SERVICIOS.value
 
-    def get_data(self) -> DataFrame:
-        return self.df_encuestas[["BibliotecaID", self.column_name]]
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.survey_data(bibliotecas, self.column_name)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
-        data[self.column_name] = data[self.column_name].apply(
-            lambda x: (
-                0
-                if not notnull(x) or "no usamos" in x.strip().lower()
-                else len(
-                    [
-                        system
-                        for system in x.split(",")
-                        if "usamos" in system.strip().lower()
-                    ]
-                )
-            )
-        )
+        data = self.get_data(bibliotecas)
+        # Cuántos de los sistemas separados por coma dicen "usamos"; nada si la
+        # respuesta falta o incluye "no usamos". Cada sistema con "usamos" es una
+        # coincidencia de la expresión, que abarca del inicio al fin del sistema
+        respuestas = data[self.column_name].astype("string").str.lower()
+        ninguno = respuestas.str.contains("no usamos", regex=False).fillna(True)
+        usados = respuestas.str.count(r"[^,]*usamos[^,]*").fillna(0)
+        data[self.column_name] = np.where(
+            ninguno.to_numpy(dtype=bool), 0, usados.to_numpy(dtype=np.int16)
+        ).astype(np.int16)
         return data
 
 
+NIVEL_ORDEN_SCORES = score_table(
+    {
+        "Sin orden ni sistema de organización.": 0,
+        "Agrupación básica en estanterías sin criterio específico.": 1,
+        "Organización por categorías temáticas generales.": 2,
+        "Secciones etiquetadas y señalizadas por temas.": 3,
+        "Clasificación con códigos simples en cada libro.": 4,
+        "Sistema detallado de clasificación.": 5,
+    }
+)
+
+
 class NivelDetalleOrganizacionColeccionCoordinate(AnalysisCoordinate):
     def __init__(self, driver, df_encuestas):
         super().__init__(
@@ -49,24 +57,27 @@ class NivelDetalleOrganizacionColeccionCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.SISTEMATIZACION_SERVICIOS.value
 
-    def get_data(self) -> DataFrame:
-        return self.df_encuestas[["BibliotecaID", self.column_name]]
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.survey_data(bibliotecas, self.column_name)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
-        nivel_orden_scores = {
-            "Sin orden ni sistema de organización.": 0,
-            "Agrupación básica en estanterías sin criterio específico.": 1,
-            "Organización por categorías temáticas generales.": 2,
-            "Secciones etiquetadas y señalizadas por temas.": 3,
-            "Clasificación con códigos simples en cada libro.": 4,
-            "Sistema detallado de clasificación.": 5,
-        }
-        data[self.column_name] = data[self.column_name].map(nivel_orden_scores)
+        data = self.get_data(bibliotecas)
+        data[self.column_name] = self.map_scores(
+            data[self.column_name], NIVEL_ORDEN_SCORES
+        )
         return data
 
 
+TIEMPO_BUSQUEDA_SCORES = score_table(
+    {
+        "30 minutos o más.": 0,
+        "20 minutos.": 1,
+        "10 minutos.": 2,
+        "5 minutos.": 3,
+    }
+)
+
+
 class TiempoBusquedaLibroCoordinate(AnalysisCoordinate):
     def __init__(self, driver, df_encuestas):
         super().__init__(
@@ -78,22 +89,27 @@ class TiempoBusquedaLibroCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.SISTEMATIZACION_SERVICIOS.value
 
-    def get_data(self) -> DataFrame:
-        return self.df_encuestas[["BibliotecaID", self.column_name]]
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.survey_data(bibliotecas, self.column_name)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
-        tiempo_busqueda_scores = {
-            "30 minutos o más.": 0,
-            "20 minutos.": 1,
-            "10 minutos.": 2,
-            "5 minutos.": 3,
-        }
-        data[self.column_name] = data[self.column_name].map(tiempo_busqueda_scores)
+        data = self.get_data(bibliotecas)
+        data[self.column_name] = self.map_scores(
+            data[self.column_name], TIEMPO_BUSQUEDA_SCORES
+        )
         return data
 
 
+REGISTRO_USUARIOS_SCORES = score_table(
+    {
+        "No registra.": 0,
+        "Registro análogo.": 1,
+        "Registro en hojas de cálculo.": 2,
+        "Registro en software bibliográfico.": 3,
+    }
+)
+
+
 class SistemaRegistroUsuariosCoordinate(AnalysisCoordinate):
     def __init__(self, driver, df_encuestas):
         super().__init__(
@@ -105,22 +121,27 @@ class SistemaRegistroUsuariosCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.SISTEMATIZACION_SERVICIOS.value
 
-    def get_data(self) -> DataFrame:
-        return self.df_encuestas[["BibliotecaID", self.column_name]]
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.survey_data(bibliotecas, self.column_name)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
-        registro_usuarios_scores = {
-            "No registra.": 0,
-            "Registro análogo.": 1,
-            "Registro en hojas de cálculo.": 2,
-            "Registro en software bibliográfico.": 3,
-        }
-        data[self.column_name] = data[self.column_name].map(registro_usuarios_scores)
+        data = self.get_data(bibliotecas)
+        data[self.column_name] = self.map_scores(
+            data[self.column_name], REGISTRO_USUARIOS_SCORES
+        )
         return data
 
 
+REGLAMENTO_SERVICIOS_SCORES = score_table(
+    {
+        "No existe.": 0,
+        "Reglamento en borrador.": 1,
+        "Reglamento aprobado internamente.": 2,
+        "Reglamento difundido a los usuarios.": 3,
+    }
+)
+
+
 class ReglamentoServiciosCoordinate(AnalysisCoordinate):
     def __init__(self, driver, df_encuestas):
         super().__init__(
@@ -132,22 +153,28 @@ class ReglamentoServiciosCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.SISTEMATIZACION_SERVICIOS.value
 
-    def get_data(self) -> DataFrame:
-        return self.df_encuestas[["BibliotecaID", self.column_name]]
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.survey_data(bibliotecas, self.column_name)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
-        reglamento_servicios_scores = {
-            "No existe.": 0,
-            "Reglamento en borrador.": 1,
-            "Reglamento aprobado internamente.": 2,
-            "Reglamento difundido a los usuarios.": 3,
-        }
-        data[self.column_name] = data[self.column_name].map(reglamento_servicios_scores)
+        data = self.get_data(bibliotecas)
+        data[self.column_name] = self.map_scores(
+            data[self.column_name], REGLAMENTO_SERVICIOS_SCORES
+        )
         return data
 
 
+PRESTAMO_EXTERNO_SCORES = score_table(
+    {
+        "No realiza préstamos.": 0,
+        "Préstamos sin registro.": 1,
+        "Registro análogo.": 2,
+        "Registro hoja de cálculo.": 3,
+        "Registro en software bibliográfico.": 4,
+    }
+)
+
+
 class SistematizacionPrestamoExternoCoordinate(AnalysisCoordinate):
     def __init__(self, driver, df_encuestas):
         super().__init__(
@@ -159,18 +186,12 @@ class SistematizacionPrestamoExternoCoordinate(AnalysisCoordinate):
         )
         self.category = AnalysisCategory.SISTEMATIZACION_SERVICIOS.value
 
-    def get_data(self) -> DataFrame:
-        return self.df_encuestas[["BibliotecaID", self.column_name]]
+    def get_data(self, bibliotecas: list[str]) -> DataFrame:
+        return self.survey_data(bibliotecas, self.column_name)
 
     def calculate_score(self, bibliotecas: list[str]) -> DataFrame:
-        data = self.get_data()
-        data = data[data["BibliotecaID"].isin(bibliotecas)]
-        prestamo_externo_scores = {
-            "No realiza préstamos.": 0,
-            "Préstamos sin registro.": 1,
-            "Registro análogo.": 2,
-            "Registro hoja de cálculo.": 3,
-            "Registro en software bibliográfico.": 4,
-        }
-        data[self.column_name] = data[self.column_name].map(prestamo_externo_scores)
+        data = self.get_data(bibliotecas)
+        data[self.column_name] = self.map_scores(
+            data[self.column_name], PRESTAMO_EXTERNO_SCORES
+        )
         return data
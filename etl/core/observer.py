@@ -41,9 +41,9 @@ class ETLObserver:
 
         if step_type == "error":
             self.metrics["errors"].append(message)
-            self.logger.error(f"{timestamp} - {message}")
+            self.logger.error("%s - %s", timestamp, message)
         else:
-            self.logger.info(f"{timestamp} - {message}")
+            self.logger.info("%s - %s", timestamp, message)
 
     def get_metrics(self) -> Dict:
         """
@@ -1,66 +1,88 @@
-from typing import Dict
+from typing import Dict, List
 from .neo4j_destination import Neo4jDestination
+from etl.utils.query_manager import Neo4JQueryManager
 
 
 class BibliotecaNeo4jDestination(Neo4jDestination):
+    # Relationships with standard mapping
+    RELATIONSHIPS_MAP = {
+        "ubicacion": "UBICADA_EN",
+        "localidad": "PERTENECE_A",
+        "redes_sociales": "TIENE_REDES",
+        "coleccion": "TIENE_COLECCION",
+        "catalogo": "TIENE_CATALOGO",
+        "tecnologia": "USA_TECNOLOGIA",
+    }
 
-    @staticmethod
-    def _process_record(tx, biblioteca_data: Dict):
-        # Create main biblioteca node
+    # List relationships
+    LIST_RELATIONSHIPS = {
+        "tipos_coleccion": "CONTIENE_TIPO",
+        "tipos_servicio": "OFRECE_SERVICIO",
+        "tipos_actividad": "REALIZA_ACTIVIDAD",
+        "tipos_tecnologia": "TIENE_TECNOLOGIA",
+        "tipos_poblacion": "ATIENDE",
+        "tipos_aliados": "ALIADA_CON",
+        "tipos_financiacion": "FINANCIADA_POR",
+    }
+
+    # Bibliotecas written per transaction, to keep each UNWIND batch bounded
+    BATCH_SIZE = 1000
+
+    def load(self, data: List[Dict]):
+        try:
+            with self.driver.session() as session:
+                for start in range(0, len(data), self.BATCH_SIZE):
+                    session.execute_write(
+                        self._process_batch, data[start : start + self.BATCH_SIZE]
+                    )
+        finally:
+            self.close()
+
+    @classmethod
+    def _process_batch(cls, tx, bibliotecas_data: List[Dict]):
+        # Each node type is written for every biblioteca with a single UNWIND
+        # query instead of one query per biblioteca and per tipo
         tx.run(
-            """
-            CREATE (b:BibliotecaComunitaria {id: $props.id})
-            SET b += $props
-        """,
-            props=biblioteca_data["biblioteca"],
+            Neo4JQueryManager.create_bibliotecas_batch(),
+            rows=[
+                biblioteca_data["biblioteca"] for biblioteca_data in bibliotecas_data
+            ],
         )
 
-        # Create relationships with standard mapping
-        relationships_map = {
-            "ubicacion": "UBICADA_EN",
-            "localidad": "PERTENECE_A",
-            "redes_sociales": "TIENE_REDES",
-            "coleccion": "TIENE_COLECCION",
-            "catalogo": "TIENE_CATALOGO",
-            "tecnologia": "USA_TECNOLOGIA",
-        }
-
-        for field, relationship in relationships_map.items():
-            if field in biblioteca_data:
-                non_null_props = {
-                    k: v for k, v in biblioteca_data[field].items() if v is not None
-                }
-                props_string = ", ".join([f"{k}: ${k}" for k in non_null_props.keys()])
+        for field, relationship in cls.RELATIONSHIPS_MAP.items():
+            # MERGE only matches on the non-null properties, so rows are grouped
+            # by the set of properties they carry
+            rows_by_keys = {}
+            for biblioteca_data in bibliotecas_data:
+                if field in biblioteca_data:
+                    non_null_props = {
+                        k: v for k, v in biblioteca_data[field].items() if v is not None
+                    }
+                    rows_by_keys.setdefault(tuple(non_null_props), []).append(
+                        {
+                            "id": biblioteca_data["biblioteca"]["id"],
+                            "props": non_null_props,
+                        }
+                    )
+            for keys, rows in rows_by_keys.items():
                 tx.run(
-                    f"""
-                    MATCH (b:BibliotecaComunitaria {{id: $biblioteca_id}})
-                    MERGE (n:{field.title()} {{{props_string}}})
-                    CREATE (b)-[:{relationship}]->(n)
-                """,
-                    biblioteca_id=biblioteca_data["biblioteca"]["id"],
-                    **non_null_props,
+                    Neo4JQueryManager.merge_and_link_nodes_batch(
+                        field.title(), relationship, keys
+                    ),
+                    rows=rows,
                 )
 
-        # Handle list relationships
-        list_relationships = {
-            "tipos_coleccion": "CONTIENE_TIPO",
-            "tipos_servicio": "OFRECE_SERVICIO",
-            "tipos_actividad": "REALIZA_ACTIVIDAD",
-            "tipos_tecnologia": "TIENE_TECNOLOGIA",
-            "tipos_poblacion": "ATIENDE",
-            "tipos_aliados": "ALIADA_CON",
-            "tipos_financiacion": "FINANCIADA_POR",
-        }
-
-        for field, relationship in list_relationships.items():
-            if field in biblioteca_data:
-                for item in biblioteca_data[field]:
-                    tx.run(
-                        f"""
-                        MATCH (b:BibliotecaComunitaria {{id: $biblioteca_id}})
-                        MERGE (t:{field.title()} {{nombre: $nombre}})
-                        MERGE (b)-[:{relationship}]->(t)
-                    """,
-                        biblioteca_id=biblioteca_data["biblioteca"]["id"],
-                        nombre=item["nombre"],
-                    )
+        for field, relationship in cls.LIST_RELATIONSHIPS.items():
+            rows = [
+                {"id": biblioteca_data["biblioteca"]["id"], "nombre": item["nombre"]}
+                for biblioteca_data in bibliotecas_data
+                if field in biblioteca_data
+                for item in biblioteca_data[field]
+            ]
+            if rows:
+                tx.run(
+                    Neo4JQueryManager.merge_and_link_tipos_batch(
+                        field.title(), relationship
+                    ),
+                    rows=rows,
+                )
@@ -1,10 +1,11 @@
 from etl.core.base import DataSource
-from etl.utils.utils import extract_csv
+from etl.utils.utils import extract_csv_frame
+import pandas as pd
 
 
 class CSVDataSource(DataSource):
     def __init__(self, file_path: str):
         self.file_path = file_path
 
-    def extract(self) -> list[dict]:
-        return extract_csv(self.file_path)
+    def extract(self) -> pd.DataFrame:
+        return extract_csv_frame(self.file_path)
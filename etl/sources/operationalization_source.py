@@ -1,57 +1,212 @@
 from etl.core.base import DataSource
 from etl.utils.models import Neo4JConfig
+from etl.utils.utils import setup_logger
 from neo4j import GraphDatabase
+import numpy as np
 import pandas as pd
 from dataclasses import dataclass
+from functools import cached_property
+from typing import Iterator
+
+logger = setup_logger("etl.log", "etl.sources.operationalization")
+
+# Nombres de columna de la encuesta, en el orden de las preguntas del formulario
+_SURVEY_COLUMNS = pd.Index(
+    [
+        "marca_temporal",
+        "BibliotecaID",
+        "nombre_biblioteca_comunitaria",
+        "direccion",
+        "barrio",
+        "representante",
+        "número_contacto",
+        "catalogo_digitalización",
+        "porcentaje_coleccion_catalogada",
+        "nivel_detalle_catalogo",
+        "sistemas_clasificacion",
+        "nivel_detalle_organizacion_coleccion",
+        "tiempo_busqueda_libro",
+        "sistema_registro_usuarios",
+        "reglamento_servicios",
+        "sistematización_prestamo_externo",
+        "percepcion_estado_colecciones",
+        "enfoques_colecciones",
+        "actividades_mediacion",
+        "frecuencia_actividades_mediacion",
+        "colecciones_especiales",
+        "nivel_interes_digitalizacion_koha",
+        "nivel_impacto_adoptar_koha",
+        "capacidad_tecnica_personal",
+        "sobrecarga_admin_catalogo",
+    ]
+)
+
+# Columnas que leen las coordenadas; las demás (marca temporal, datos de contacto,
+# interés en Koha) no se cargan
+_USED_COLUMNS = [
+    "BibliotecaID",
+    "catalogo_digitalización",
+    "porcentaje_coleccion_catalogada",
+    "nivel_detalle_catalogo",
+    "sistemas_clasificacion",
+    "nivel_detalle_organizacion_coleccion",
+    "tiempo_busqueda_libro",
+    "sistema_registro_usuarios",
+    "reglamento_servicios",
+    "sistematización_prestamo_externo",
+    "percepcion_estado_colecciones",
+    "enfoques_colecciones",
+    "actividades_mediacion",
+    "frecuencia_actividades_mediacion",
+    "colecciones_especiales",
+    "nivel_impacto_adoptar_koha",
+    "capacidad_tecnica_personal",
+    "sobrecarga_admin_catalogo",
+]
+# Posición de cada columna usada en el CSV, en el orden del archivo
+_USED_POSITIONS = sorted(_SURVEY_COLUMNS.get_indexer(_USED_COLUMNS))
+
+# Preguntas de selección única con un conjunto fijo de respuestas; se guardan
+# como category para que las coordenadas puntúen cada respuesta una sola vez.
+# BibliotecaID también, para que las búsquedas y alineaciones por biblioteca
+# comparen códigos enteros y la tabla hash de sus categorías se construya una vez
+_CATEGORICAL_COLUMNS = [
+    "BibliotecaID",
+    "catalogo_digitalización",
+    "nivel_detalle_catalogo",
+    "nivel_detalle_organizacion_coleccion",
+    "tiempo_busqueda_libro",
+    "sistema_registro_usuarios",
+    "reglamento_servicios",
+    "sistematización_prestamo_externo",
+    "percepcion_estado_colecciones",
+    "frecuencia_actividades_mediacion",
+    "nivel_impacto_adoptar_koha",
+    "capacidad_tecnica_personal",
+    "sobrecarga_admin_catalogo",
+]
 
 
 @dataclass
 class OperationalizationDataSource:
     df_encuestas: pd.DataFrame
-    bibliotecas_id: list
+    bibliotecas_id: np.ndarray
     driver: GraphDatabase.driver
+    # Índice de bibliotecas_id; su tabla hash se construye una vez y se reutiliza
+    # en cada búsqueda de ids
+    bibliotecas_index: pd.Index = None
+    # Filas de df_encuestas cuyo BibliotecaID está en bibliotecas_id
+    bibliotecas_mask: pd.Series = None
+
+    def __post_init__(self):
+        if self.bibliotecas_index is None:
+            self.bibliotecas_index = pd.Index(self.bibliotecas_id, name="BibliotecaID")
+        if self.bibliotecas_mask is None:
+            self.bibliotecas_mask = self.contains(self.df_encuestas["BibliotecaID"])
+
+    def contains(self, ids: pd.Series) -> pd.Series:
+        """
+        Como ids.isin(bibliotecas_id), pero con la tabla hash de bibliotecas_index
+        en lugar de construir una nueva en cada llamada.
+        """
+        found = self.bibliotecas_index.get_indexer_for(ids) != -1
+        return pd.Series(found, index=ids.index, name=ids.name)
 
     def __len__(self) -> int:
         return self.df_encuestas.shape[0]
 
 
 class OperationalizationSource(DataSource):
-    def __init__(self, neo4j_config: Neo4JConfig, survey_path: str):
+    def __init__(
+        self, neo4j_config: Neo4JConfig, survey_path: str, use_pyarrow: bool = True
+    ):
         self.driver = GraphDatabase.driver(
-            neo4j_config.uri, auth=(neo4j_config.user, neo4j_config.password)
+            neo4j_config.uri,
+            auth=(neo4j_config.user, neo4j_config.password),
+            max_connection_pool_size=16,
         )
         self.survey_path = survey_path
+        self.use_pyarrow = use_pyarrow
 
     def extract(self) -> OperationalizationDataSource:
-        col_names = [
-            "marca_temporal",
-            "BibliotecaID",
-            "nombre_biblioteca_comunitaria",
-            "direccion",
-            "barrio",
-            "representante",
-            "número_contacto",
-            "catalogo_digitalización",
-            "porcentaje_coleccion_catalogada",
-            "nivel_detalle_catalogo",
-            "sistemas_clasificacion",
-            "nivel_detalle_organizacion_coleccion",
-            "tiempo_busqueda_libro",
-            "sistema_registro_usuarios",
-            "reglamento_servicios",
-            "sistematización_prestamo_externo",
-            "percepcion_estado_colecciones",
-            "enfoques_colecciones",
-            "actividades_mediacion",
-            "frecuencia_actividades_mediacion",
-            "colecciones_especiales",
-            "nivel_interes_digitalizacion_koha",
-            "nivel_impacto_adoptar_koha",
-            "capacidad_tecnica_personal",
-            "sobrecarga_admin_catalogo",
-        ]
-        df_encuestas = pd.read_csv(self.survey_path, header=0, names=col_names)
-        bibliotecas_id = df_encuestas["BibliotecaID"].unique()
+        return self._to_data_source(self._read_survey())
+
+    def extract_iter(
+        self, chunksize: int = 100_000
+    ) -> Iterator[OperationalizationDataSource]:
+        """
+        Lee la encuesta en bloques de `chunksize` filas, para que la memoria máxima
+        dependa del bloque y no del archivo completo. El driver se cierra al
+        terminar la iteración.
+        """
+        try:
+            for chunk in self._read_survey_chunks(chunksize):
+                yield self._to_data_source(chunk)
+        finally:
+            self.driver.close()
+
+    def _to_data_source(
+        self, df_encuestas: pd.DataFrame
+    ) -> OperationalizationDataSource:
+        df_encuestas = df_encuestas.set_axis(_SURVEY_COLUMNS[_USED_POSITIONS], axis=1)
+        df_encuestas = df_encuestas.astype(
+            dict.fromkeys(_CATEGORICAL_COLUMNS, "category")
+        )
+        bibliotecas_id = (
+            df_encuestas["BibliotecaID"].drop_duplicates().to_numpy(dtype=object)
+        )
+        # bibliotecas_id sale de la misma encuesta, así que todas sus filas quedan
+        # incluidas y no hace falta buscar cada BibliotecaID
         return OperationalizationDataSource(
-            df_encuestas=df_encuestas, bibliotecas_id=bibliotecas_id, driver=self.driver
+            df_encuestas=df_encuestas,
+            bibliotecas_id=bibliotecas_id,
+            driver=self.driver,
+            bibliotecas_mask=pd.Series(True, index=df_encuestas.index),
         )
+
+    def _read_survey_chunks(self, chunksize: int) -> Iterator[pd.DataFrame]:
+        """
+        El motor pyarrow no lee por bloques, así que los bloques salen del motor por
+        defecto; con pyarrow activado sus columnas siguen siendo de Arrow, como en
+        extract().
+        """
+        if self.use_pyarrow:
+            try:
+                import pyarrow  # noqa: F401
+
+                return pd.read_csv(
+                    self.survey_path,
+                    usecols=self._usecols,
+                    chunksize=chunksize,
+                    dtype_backend="pyarrow",
+                )
+            except ImportError:
+                logger.warning("pyarrow not available, using the pandas CSV engine")
+        return pd.read_csv(self.survey_path, usecols=self._usecols, chunksize=chunksize)
+
+    def _read_survey(self) -> pd.DataFrame:
+        """
+        Lee el CSV de la encuesta con el parser multihilo de pyarrow si está
+        activado, o con el motor por defecto de pandas si pyarrow no está instalado.
+        """
+        if self.use_pyarrow:
+            try:
+                return pd.read_csv(
+                    self.survey_path,
+                    usecols=self._usecols,
+                    engine="pyarrow",
+                    dtype_backend="pyarrow",
+                )
+            except ImportError:
+                logger.warning("pyarrow not available, using the pandas CSV engine")
+        return pd.read_csv(self.survey_path, usecols=self._usecols)
+
+    @cached_property
+    def _usecols(self) -> list[str]:
+        """
+        Encabezados de las columnas de _USED_COLUMNS. Los encabezados del CSV son
+        las preguntas del formulario, así que las columnas se ubican por posición;
+        el encabezado se lee una sola vez por fuente.
+        """
+        header = pd.read_csv(self.survey_path, nrows=0).columns
+        return header[_USED_POSITIONS].tolist()
@@ -1,14 +1,23 @@
-from typing import List, Dict
+import numpy as np
+import pandas as pd
+
+from functools import lru_cache
+from typing import ClassVar, List, Dict, Tuple, Union
 from dataclasses import dataclass
 from etl.core import DataTransformer
-from etl.utils.utils import parsear_fecha, a_float, a_bool, a_int, setup_logger
+from etl.utils.utils import (
+    columna_a_bool,
+    columna_a_fecha,
+    columna_a_float,
+    setup_logger,
+)
 
 logger = setup_logger("etl.log", "etl.transformers.bibliotecas")
 
 
 @dataclass
 class TransformationConfig:
-    TIPOS_COLECCION = [
+    TIPOS_COLECCION: ClassVar[Tuple[str, ...]] = (
         "literatura",
         "infantiles",
         "informativos",
@@ -22,8 +31,8 @@ class TransformationConfig:
         "enfoques",
         "autoedicion",
         "otros",
-    ]
-    TIPOS_SERVICIO = [
+    )
+    TIPOS_SERVICIO: ClassVar[Tuple[str, ...]] = (
         "consulta",
         "prestamo_externo",
         "internet",
@@ -32,8 +41,8 @@ class TransformationConfig:
         "alfabetizacion",
         "comunitarios",
         "otros",
-    ]
-    TIPOS_ACTIVIDAD = [
+    )
+    TIPOS_ACTIVIDAD: ClassVar[Tuple[str, ...]] = (
         "lectoescritura",
         "culturales",
         "formacion",
@@ -43,8 +52,8 @@ class TransformationConfig:
         "psicosociales",
         "ciencia",
         "otros",
-    ]
-    TIPOS_TECNOLOGIA = [
+    )
+    TIPOS_TECNOLOGIA: ClassVar[Tuple[str, ...]] = (
         "computadores",
         "impresoras",
         "tabletas",
@@ -52,16 +61,16 @@ class TransformationConfig:
         "smartphones",
         "ninguno",
         "otros",
-    ]
-    TIPOS_POBLACION = [
+    )
+    TIPOS_POBLACION: ClassVar[Tuple[str, ...]] = (
         "infancias",
         "jovenes",
         "mujeres",
         "adultos_mayores",
         "migrantes",
         "otros",
-    ]
-    TIPOS_ALIADOS = [
+    )
+    TIPOS_ALIADOS: ClassVar[Tuple[str, ...]] = (
         "editoriales",
         "fundaciones",
         "colectivos",
@@ -70,15 +79,95 @@ class TransformationConfig:
         "educativos",
         "bibliotecas_comunitarias",
         "otros",
-    ]
-    TIPOS_FINANCIACION = [
+    )
+    TIPOS_FINANCIACION: ClassVar[Tuple[str, ...]] = (
         "autogestion",
         "estimulos_distrito",
         "becas",
         "convocatorias_internacionales",
         "patrocinios",
         "otros",
-    ]
+    )
+
+
+# (output field, ((output key, input column), ...)) for every single-valued field
+_FLAT_FIELDS = (
+    (
+        "biblioteca",
+        (
+            ("id", "2_id"),
+            ("nombre", "3_nombre_organizacion"),
+            ("fecha_registro", "1_fecha_registro"),
+            ("estado", "4_estado"),
+            ("inicio_actividades", "20_inicio_actividades"),
+            ("representante", "5_representante"),
+            ("telefono", "11_telefono"),
+            ("correo_electronico", "12_correo_electronico"),
+            ("whatsapp", "17_whatsapp"),
+            ("dias_atencion", "21_dias_atencion"),
+            ("enlace_fotos", "22_enlace_fotos"),
+        ),
+    ),
+    (
+        "ubicacion",
+        (
+            ("latitud", "7_latitud"),
+            ("longitud", "8_longitud"),
+            ("barrio", "10_barrio"),
+            ("direccion", "6_direccion"),
+        ),
+    ),
+    ("localidad", (("nombre", "9_localidad"),)),
+    (
+        "redes_sociales",
+        (
+            ("facebook", "13_facebook"),
+            ("enlace_facebook", "14_enlace_facebook"),
+            ("instagram", "15_instagram"),
+            ("enlace_instagram", "16_enlace_instagram"),
+            ("youtube", "18_youtube"),
+            ("enlace_youtube", "19_enlace_youtube"),
+        ),
+    ),
+    (
+        "coleccion",
+        (
+            ("inventario", "23_inventario"),
+            ("cantidad_inventario", "24_cantidad_inventario"),
+            ("coleccion", "25_coleccion"),
+        ),
+    ),
+    (
+        "catalogo",
+        (
+            ("catalogo", "27_catalogo"),
+            ("quiere_catalogo", "28_quiere_catalogo"),
+        ),
+    ),
+    ("soporte_catalogo", (("tipo", "29_soporte_catalogo"),)),
+    ("tecnologia", (("conectividad", "32_conectividad"),)),
+)
+
+
+# (output field, output keys, input columns, frame columns) for every single-valued
+# field; frame columns are the "field.key" names used by transform_to_frame
+_FIELD_COLUMNS = tuple(
+    (
+        field,
+        [key for key, _ in pairs],
+        [column for _, column in pairs],
+        [f"{field}.{key}" for key, _ in pairs],
+    )
+    for field, pairs in _FLAT_FIELDS
+)
+_INPUT_COLUMNS = [column for _, _, columns, _ in _FIELD_COLUMNS for column in columns]
+_FRAME_COLUMNS = [column for _, _, _, columns in _FIELD_COLUMNS for column in columns]
+
+
+@lru_cache(maxsize=None)
+def _tipo_keys(tipos: Tuple[str, ...], prefix: str) -> Tuple[str, ...]:
+    """Input column names of a type group, e.g. 33_tic_computadores."""
+    return tuple(f"{prefix}{tipo}" for tipo in tipos)
 
 
 class BibliotecasTransformer(DataTransformer):
@@ -87,136 +176,177 @@ class BibliotecasTransformer(DataTransformer):
     Handles the specific transformation logic for library data before loading into Neo4j.
     """
 
-    def transform(self, data: List[Dict], drop_missing_data: bool =False) -> List[Dict]:
+    FECHA_COLUMNS = ["1_fecha_registro", "20_inicio_actividades"]
+    FLOAT_COLUMNS = ["7_latitud", "8_longitud"]
+    BOOL_COLUMNS = [
+        "23_inventario",
+        "27_catalogo",
+        "28_quiere_catalogo",
+        "32_conectividad",
+    ]
+    REQUIRED_COLUMNS = ["2_id", "3_nombre_organizacion", "9_localidad", "10_barrio"]
+    TIPOS_GROUPS = {
+        "tipos_coleccion": (TransformationConfig.TIPOS_COLECCION, "26_tipo_coleccion_"),
+        "tipos_servicio": (TransformationConfig.TIPOS_SERVICIO, "30_servicios_"),
+        "tipos_actividad": (TransformationConfig.TIPOS_ACTIVIDAD, "31_actividades_"),
+        "tipos_tecnologia": (TransformationConfig.TIPOS_TECNOLOGIA, "33_tic_"),
+        "tipos_poblacion": (TransformationConfig.TIPOS_POBLACION, "34_poblacion_"),
+        "tipos_aliados": (TransformationConfig.TIPOS_ALIADOS, "35_aliados_"),
+        "tipos_financiacion": (
+            TransformationConfig.TIPOS_FINANCIACION,
+            "36_fuentes_financiacion_",
+        ),
+    }
+    # Name arrays and bit values per type group, built once at class load
+    _TIPO_NAMES = {
+        field: np.array(tipos, dtype=object)
+        for field, (tipos, _) in TIPOS_GROUPS.items()
+    }
+    _TIPO_BITS = {
+        field: np.left_shift(np.uint64(1), np.arange(len(tipos), dtype=np.uint64))
+        for field, (tipos, _) in TIPOS_GROUPS.items()
+    }
+
+    def transform(
+        self, data: Union[List[Dict], pd.DataFrame], drop_missing_data: bool = False
+    ) -> List[Dict]:
         """
         Transforms raw library data into Neo4j compatible format.
 
+        Type coercion runs once per column over the whole DataFrame; only the
+        final assembly of the nested records is done row by row.
+
         Args:
-            data (List[Dict]): Raw data from the source
+            data (Union[List[Dict], pd.DataFrame]): Raw data from the source
             drop_missing_data (bool): if True drop rows with missing values
 
         Returns:
             List[Dict]: Transformed data ready for Neo4j import
 
         """
-        transformed_data = []
-        data = data[1:]  # Skip the header row
+        return self.to_records(self.transform_to_frame(data, drop_missing_data))
+
+    def transform_to_frame(
+        self, data: Union[List[Dict], pd.DataFrame], drop_missing_data: bool = False
+    ) -> pd.DataFrame:
+        """
+        Transforms raw library data into a columnar frame, one row per library.
+
+        Single-valued fields become "field.key" columns (e.g. "ubicacion.latitud")
+        and every type group a uint64 bitmask column named after the group.
+
+        Args:
+            data (Union[List[Dict], pd.DataFrame]): Raw data from the source
+            drop_missing_data (bool): if True drop rows with missing values
+
+        Returns:
+            pd.DataFrame: Coerced library data, see to_records for the nested form
+        """
+        df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+        df = df.iloc[1:]  # Skip the header row
+        if df.empty:
+            return pd.DataFrame(columns=_FRAME_COLUMNS + list(self.TIPOS_GROUPS))
 
         if drop_missing_data:
-            data = [biblioteca for biblioteca in data if not biblioteca["23_inventario"] == '']
-
-        for row in data:
-
-            try:
-                if self.validate_data(row):
-                    transformed_row = self._transform_row(row)
-                    transformed_data.append(transformed_row)
-                else:
-                    logger.warning(
-                        f"Invalid data row: {row.get('nombre_biblioteca', 'unknown')}"
-                    )
-            except Exception as e:
-                logger.error(f"Error transforming row: {e}")
-                continue
-
-        return transformed_data
-
-    def _transform_row(self, row: Dict) -> Dict:
-        """Transform a single data row into Neo4j format."""
-        return {
-            "biblioteca": self._transform_biblioteca(row),
-            "ubicacion": self._transform_ubicacion(row),
-            "localidad": {"nombre": row["9_localidad"]},
-            "redes_sociales": self._transform_redes_sociales(row),
-            "coleccion": self._transform_coleccion(row),
-            "tipos_coleccion": self._transform_tipos(
-                row, TransformationConfig.TIPOS_COLECCION, "26_tipo_coleccion_"
-            ),
-            "catalogo": self._transform_catalogo(row),
-            "soporte_catalogo": {"tipo": row["29_soporte_catalogo"]},
-            "tipos_servicio": self._transform_tipos(
-                row, TransformationConfig.TIPOS_SERVICIO, "30_servicios_"
-            ),
-            "tipos_actividad": self._transform_tipos(
-                row, TransformationConfig.TIPOS_ACTIVIDAD, "31_actividades_"
-            ),
-            "tecnologia": {"conectividad": a_bool(row["32_conectividad"])},
-            "tipos_tecnologia": self._transform_tipos(
-                row, TransformationConfig.TIPOS_TECNOLOGIA, "33_tic_"
-            ),
-            "tipos_poblacion": self._transform_tipos(
-                row, TransformationConfig.TIPOS_POBLACION, "34_poblacion_"
-            ),
-            "tipos_aliados": self._transform_tipos(
-                row, TransformationConfig.TIPOS_ALIADOS, "35_aliados_"
-            ),
-            "tipos_financiacion": self._transform_tipos(
-                row, TransformationConfig.TIPOS_FINANCIACION, "36_fuentes_financiacion_"
-            ),
-        }
+            df = df[df["23_inventario"] != ""]
 
-    @staticmethod
-    def _transform_biblioteca(row: Dict) -> Dict:
-        """Transform biblioteca-specific fields."""
-        return {
-            "id": row["2_id"],
-            "nombre": row["3_nombre_organizacion"],
-            "fecha_registro": parsear_fecha(row["1_fecha_registro"]),
-            "estado": row["4_estado"],
-            "inicio_actividades": parsear_fecha(row["20_inicio_actividades"]),
-            "representante": row["5_representante"],
-            "telefono": row["11_telefono"],
-            "correo_electronico": row["12_correo_electronico"],
-            "whatsapp": row["17_whatsapp"],
-            "dias_atencion": row["21_dias_atencion"],
-            "enlace_fotos": row["22_enlace_fotos"],
-        }
+        good, bad = self._coerce_bulk(df)
+        if not bad.empty:
+            logger.warning("Dropped %d invalid data rows", len(bad))
 
-    @staticmethod
-    def _transform_ubicacion(row: Dict) -> Dict:
-        """Transform location-specific fields."""
-        return {
-            "latitud": a_float(row["7_latitud"]),
-            "longitud": a_float(row["8_longitud"]),
-            "barrio": row["10_barrio"],
-            "direccion": row["6_direccion"],
-        }
+        frame = good[_INPUT_COLUMNS].set_axis(_FRAME_COLUMNS, axis=1)
+        return frame.assign(**self._pack_tipos(good))
 
-    @staticmethod
-    def _transform_redes_sociales(row: Dict) -> Dict:
-        """Transform social media fields."""
-        return {
-            "facebook": row["13_facebook"],
-            "enlace_facebook": row["14_enlace_facebook"],
-            "instagram": row["15_instagram"],
-            "enlace_instagram": row["16_enlace_instagram"],
-            "youtube": row["18_youtube"],
-            "enlace_youtube": row["19_enlace_youtube"],
-        }
+    @classmethod
+    def to_records(cls, frame: pd.DataFrame) -> List[Dict]:
+        """
+        Assemble the nested Neo4j records from a frame built by transform_to_frame.
 
-    @staticmethod
-    def _transform_coleccion(row: Dict) -> Dict:
-        """Transform collection-specific fields."""
-        return {
-            "inventario": a_bool(row["23_inventario"]),
-            "cantidad_inventario": row["24_cantidad_inventario"],
-            "coleccion": row["25_coleccion"],
-        }
+        Each nested field is built for all rows at once from its own columns, so
+        the only per-row work left is zipping the fields into one record.
 
-    @staticmethod
-    def _transform_catalogo(row: Dict) -> Dict:
-        """Transform catalog-specific fields."""
-        return {
-            "catalogo": a_bool(row["27_catalogo"]),
-            "quiere_catalogo": a_bool(row["28_quiere_catalogo"]),
+        Args:
+            frame (pd.DataFrame): Output of transform_to_frame, or a slice of it
+
+        Returns:
+            List[Dict]: Transformed data ready for Neo4j import
+        """
+        if frame.empty:
+            return []
+
+        columns = {
+            field: frame[frame_columns].set_axis(keys, axis=1).to_dict(orient="records")
+            for field, keys, _, frame_columns in _FIELD_COLUMNS
         }
+        columns.update(
+            (field, cls._unpack_tipos(field, frame[field].to_numpy(dtype=np.uint64)))
+            for field in cls.TIPOS_GROUPS
+        )
+        fields = tuple(columns)
+        return [dict(zip(fields, values)) for values in zip(*columns.values())]
 
-    @staticmethod
-    def _transform_tipos(row: Dict, tipos: List[str], prefix: str) -> List[Dict]:
-        """Transform type-specific fields with common prefix."""
-        return [
-            {"nombre": tipo} for tipo in tipos if a_bool(row.get(f"{prefix}{tipo}"))
+    @classmethod
+    def _coerce_bulk(cls, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Splits off the rows missing a required column and coerces the rest.
+
+        Args:
+            df (pd.DataFrame): Raw library rows
+
+        Returns:
+            Tuple[pd.DataFrame, pd.DataFrame]: Coerced valid rows and raw invalid rows
+        """
+        required = df.reindex(columns=cls.REQUIRED_COLUMNS)
+        valid = (required.notna() & required.ne("")).all(axis=1)
+        return cls._coerce_columns(df[valid]), df[~valid]
+
+    @classmethod
+    def _coerce_columns(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """Coerce dates, floats and flags column-wise; missing values become None."""
+        df = df.copy()
+        for column in cls.FECHA_COLUMNS:
+            df[column] = columna_a_fecha(df[column])
+        for column in cls.FLOAT_COLUMNS:
+            df[column] = columna_a_float(df[column])
+        for column in cls.BOOL_COLUMNS:
+            df[column] = columna_a_bool(df[column])
+        df = df.astype(object)
+        return df.where(df.notna(), None)
+
+    @classmethod
+    def _pack_tipos(cls, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Pack the flag columns of every type group into one uint64 bitmask per row,
+        where bit i is set when the i-th tipo of the group is truthy.
+        """
+        keys = [
+            key
+            for tipos, prefix in cls.TIPOS_GROUPS.values()
+            for key in _tipo_keys(tipos, prefix)
+        ]
+        mask = (
+            df.reindex(columns=keys, fill_value="")
+            .apply(columna_a_bool)
+            .to_numpy(dtype=np.uint64)
+        )
+        bitmasks, start = {}, 0
+        for field, bits in cls._TIPO_BITS.items():
+            grupo = mask[:, start : start + len(bits)]
+            bitmasks[field] = (grupo * bits).sum(axis=1, dtype=np.uint64)
+            start += len(bits)
+        return bitmasks
+
+    @classmethod
+    def _unpack_tipos(cls, field: str, bitmask: np.ndarray) -> List[List[Dict]]:
+        """Materialize the [{"nombre": ...}] lists of a type group from its bitmasks."""
+        nombres, bits = cls._TIPO_NAMES[field], cls._TIPO_BITS[field]
+        # Each distinct combination of flags is decoded only once
+        valores, filas = np.unique(bitmask, return_inverse=True)
+        decodificados = [
+            [{"nombre": nombre} for nombre in nombres[(valor & bits) != 0]]
+            for valor in valores
         ]
+        return [list(decodificados[fila]) for fila in filas]
 
     @staticmethod
     def validate_data(row: Dict) -> bool:
@@ -229,5 +359,7 @@ class BibliotecasTransformer(DataTransformer):
         Returns:
             bool: True if data is valid, False otherwise
         """
-        required_fields = ["2_id", "3_nombre_organizacion", "9_localidad", "10_barrio"]
-        return all(field in row and row[field] for field in required_fields)
+        return all(
+            field in row and row[field]
+            for field in BibliotecasTransformer.REQUIRED_COLUMNS
+        )
@@ -1,6 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Union
+
 import pandas as pd
 
 from etl.core import DataTransformer
+from etl.coordinates.base import (
+    QUERY_FETCH_SIZE,
+    AnalysisCoordinate,
+    cache_query,
+    cached_query,
+)
 from etl.sources.operationalization_source import OperationalizationDataSource
 from etl.coordinates.digital_level_coordinates import (
     InfraestructuraTecnologicaCoordinate,
@@ -38,8 +47,48 @@ from etl.utils.utils import setup_logger
 logger = setup_logger("etl.log", "etl.transformers.operationalization")
 
 
+# Constructores de cada coordenada a partir de (driver, df_encuestas). Solo se
+# instancian las coordenadas habilitadas en coordinates_config.
+COORDINATE_FACTORIES: Dict[str, Callable[..., AnalysisCoordinate]] = {
+    # Nivel de avance en la digitalización del catálogo
+    "infraestructura": lambda driver, _: InfraestructuraTecnologicaCoordinate(driver),
+    "estado_digitalizacion": EstadoDigitalizacionCatalogoCoordinate,
+    "porcentaje_coleccion": PorcentajeColeccionCatalogoCoordinate,
+    "nivel_informacion": NivelInformacionCatalogoCoordinate,
+    # Nivel de avance en la sistematización
+    "sistemas_clasificacion": SistemasClasificacionCoordinate,
+    "nivel_detalle": NivelDetalleOrganizacionColeccionCoordinate,
+    "tiempo_busqueda": TiempoBusquedaLibroCoordinate,
+    "sistema_registro": SistemaRegistroUsuariosCoordinate,
+    "reglamento_servicios": ReglamentoServiciosCoordinate,
+    "sistematizacion_prestamo": SistematizacionPrestamoExternoCoordinate,
+    # Caracterización de la colección
+    "diversidad_colecciones": lambda driver, _: DiversidadColeccionesCoordinate(driver),
+    "cantidad_material": lambda driver, _: CantidadMaterialBibliograficoCoordinate(
+        driver
+    ),
+    "percepcion_estado": PercepcionEstadoFisicoColeccionCoordinate,
+    "enfoques_colecciones": EnfoquesColeccionesCoordinate,
+    "actividades_mediacion": ActividadesMediacionColeccionCoordinate,
+    "frecuencia_actividades": FrecuenciaActividadesMediacionCoordinate,
+    "colecciones_especiales": ColeccionesEspecialesCoordinate,
+    # Facilidad de Adopción del Catálogo en Koha
+    "porcentaje_catalogada": PorcentajeColeccionCatalogadaCoordinate,
+    "capacidad_tecnica": CapacidadTecnicaPersonalCoordinate,
+    # Impacto de Adoptar Koha
+    "nivel_impacto": NivelImpactoKohaCoordinate,
+    "diversidad_servicios": lambda driver, _: DiversidadServiciosCoordinate(driver),
+    "sobrecarga_administrativa": SobrecargaAdministrativaCoordinate,
+    # Detalle Colección Koha
+    "tipos_coleccion": lambda driver, _: TiposColeccionCoordinate(driver),
+}
+
+
 class OperationalizationTransformer(DataTransformer):
-    def __init__(self):
+    def __init__(self, max_workers: int = 8):
+        self.max_workers = max_workers
+        # Última fuente transformada, con sus claves habilitadas y coordenadas
+        self._coordinates_cache = (None, [], {})
         self.coordinates_config = {
             # Nivel de avance en la digitalización del catálogo
             "infraestructura": True,
@@ -72,96 +121,217 @@ class OperationalizationTransformer(DataTransformer):
             "tipos_coleccion": False,
         }
 
-    def transform(self, data_source: OperationalizationDataSource) -> pd.DataFrame:
+    def transform(
+        self,
+        data_source: Union[
+            OperationalizationDataSource, Iterable[OperationalizationDataSource]
+        ],
+    ) -> pd.DataFrame:
+        """
+        Calcula las coordenadas habilitadas para una fuente de datos, o para cada
+        fragmento de la encuesta cuando recibe un iterable (ver
+        OperationalizationSource.extract_iter), concatenando los resultados.
+        """
+        if isinstance(data_source, OperationalizationDataSource):
+            return self._transform_source(data_source)
+
+        frames = [self._transform_source(chunk) for chunk in data_source]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def _transform_source(
+        self, data_source: OperationalizationDataSource
+    ) -> pd.DataFrame:
         logger.info("Starting operationalization transformation")
-        coordinate_mappings = {
-            # Nivel de avance en la digitalización del catálogo
-            "infraestructura": InfraestructuraTecnologicaCoordinate(data_source.driver),
-            "estado_digitalizacion": EstadoDigitalizacionCatalogoCoordinate(
-                data_source.driver, data_source.df_encuestas
-            ),
-            "porcentaje_coleccion": PorcentajeColeccionCatalogoCoordinate(
-                data_source.driver, data_source.df_encuestas
-            ),
-            "nivel_informacion": NivelInformacionCatalogoCoordinate(
-                data_source.driver, data_source.df_encuestas
-            ),
-            # Nivel de avance en la sistematización
-            "sistemas_clasificacion": SistemasClasificacionCoordinate(
-                data_source.driver, data_source.df_encuestas
-            ),
-            "nivel_detalle": NivelDetalleOrganizacionColeccionCoordinate(
-                data_source.driver, data_source.df_encuestas
-            ),
-            "tiempo_busqueda": TiempoBusquedaLibroCoordinate(
-                data_source.driver, data_source.df_encuestas
-            ),
-            "sistema_registro": SistemaRegistroUsuariosCoordinate(
-                data_source.driver, data_source.df_encuestas
-            ),
-            "reglamento_servicios": ReglamentoServiciosCoordinate(
-                data_source.driver, data_source.df_encuestas
-            ),
-            "sistematizacion_prestamo": SistematizacionPrestamoExternoCoordinate(
-                data_source.driver, data_source.df_encuestas
-            ),
-            # Caracterización de la colección
-            "diversidad_colecciones": DiversidadColeccionesCoordinate(
-                data_source.driver
-            ),
-            "cantidad_material": CantidadMaterialBibliograficoCoordinate(
-                data_source.driver
-            ),
-            "percepcion_estado": PercepcionEstadoFisicoColeccionCoordinate(
-                data_source.driver, data_source.df_encuestas
-            ),
-            "enfoques_colecciones": EnfoquesColeccionesCoordinate(
-                data_source.driver, data_source.df_encuestas
-            ),
-            "actividades_mediacion": ActividadesMediacionColeccionCoordinate(
-                data_source.driver, data_source.df_encuestas
-            ),
-            "frecuencia_actividades": FrecuenciaActividadesMediacionCoordinate(
-                data_source.driver, data_source.df_encuestas
-            ),
-            "colecciones_especiales": ColeccionesEspecialesCoordinate(
-                data_source.driver, data_source.df_encuestas
-            ),
-            # Facilidad de Adopción del Catálogo en Koha
-            "porcentaje_catalogada": PorcentajeColeccionCatalogadaCoordinate(
-                data_source.driver, data_source.df_encuestas
-            ),
-            "capacidad_tecnica": CapacidadTecnicaPersonalCoordinate(
-                data_source.driver, data_source.df_encuestas
-            ),
-            # Impacto de Adoptar Koha
-            "nivel_impacto": NivelImpactoKohaCoordinate(
-                data_source.driver, data_source.df_encuestas
-            ),
-            "diversidad_servicios": DiversidadServiciosCoordinate(data_source.driver),
-            "sobrecarga_administrativa": SobrecargaAdministrativaCoordinate(
-                data_source.driver, data_source.df_encuestas
-            ),
-            # Detalle Colección Koha
-            "tipos_coleccion": TiposColeccionCoordinate(data_source.driver),
-        }
 
         results = pd.DataFrame({"BibliotecaID": data_source.bibliotecas_id})
-        for key, enabled in self.coordinates_config.items():
-            if enabled:
-                logger.debug(f"Processing coordinate: {key}")
-                coordinate = coordinate_mappings[key]
-                try:
-                    coordinate_results = coordinate.calculate_score(
-                        data_source.bibliotecas_id
-                    )
-                    results = results.merge(
-                        coordinate_results, on="BibliotecaID", how="left"
-                    )
-                    logger.info(f"Successfully processed coordinate: {key}")
-                except Exception as e:
-                    logger.error(f"Error processing coordinate {key}: {str(e)}")
-                    raise
-
-            logger.info(f"Transformation completed. Generated {len(results)} results")
+        enabled_keys = [
+            key for key, enabled in self.coordinates_config.items() if enabled
+        ]
+        coordinates = self._build_coordinates(data_source, enabled_keys)
+        # bibliotecas_id suele salir de la misma encuesta, así que el filtro incluye
+        # todas las filas y basta con seleccionar la columna, sin copiar por máscara
+        survey_mask = data_source.bibliotecas_mask
+        if survey_mask.all():
+            survey_mask = slice(None)
+        for coordinate in coordinates.values():
+            coordinate.survey_mask = survey_mask
+        self._prefetch(data_source, coordinates.values())
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(
+                    self._run_one,
+                    key,
+                    coordinates[key],
+                    data_source.bibliotecas_id,
+                ): key
+                for key in enabled_keys
+            }
+            # Como en el cálculo secuencial, el primer error detiene el proceso:
+            # se cancelan las coordenadas que aún no empezaron
+            for future in as_completed(futures):
+                if future.exception() is not None:
+                    executor.shutdown(cancel_futures=True)
+                    raise future.exception()
+            frames = [future.result() for future in futures]
+
+        results = self._combine(results, frames)
+        logger.info("Transformation completed. Generated %d results", len(results))
         return results
+
+    def _build_coordinates(
+        self, data_source: OperationalizationDataSource, enabled_keys: list[str]
+    ) -> Dict[str, AnalysisCoordinate]:
+        """
+        Instancia las coordenadas habilitadas para `data_source`. Si se vuelve a
+        transformar la misma fuente con la misma configuración, reutiliza las
+        instancias de la llamada anterior.
+        """
+        source, keys, coordinates = self._coordinates_cache
+        if source is data_source and keys == enabled_keys:
+            return coordinates
+        coordinates = {
+            key: COORDINATE_FACTORIES[key](data_source.driver, data_source.df_encuestas)
+            for key in enabled_keys
+        }
+        self._coordinates_cache = (data_source, enabled_keys, coordinates)
+        return coordinates
+
+    @staticmethod
+    def _prefetch(
+        data_source: OperationalizationDataSource,
+        coordinates: Iterable[AnalysisCoordinate],
+    ) -> None:
+        """
+        Consulta los datos de todas las coordenadas que leen el grafo en una sola
+        sesión y transacción de lectura, y los deja en `coordinate.prefetched`. Las
+        consultas que ya están en la caché de run_query no se repiten.
+
+        Args:
+            data_source (OperationalizationDataSource): Driver e ids de bibliotecas.
+            coordinates (Iterable[AnalysisCoordinate]): Coordenadas habilitadas.
+        """
+        driver = data_source.driver
+        ids = tuple(data_source.bibliotecas_id)
+        pending = []
+        for coordinate in coordinates:
+            if coordinate.cypher() is None:
+                continue
+            # calculate_score agrega columnas, así que cada coordenada usa una copia
+            frame = cached_query(driver, type(coordinate), ids)
+            if frame is None:
+                pending.append(coordinate)
+            else:
+                coordinate.prefetched = frame.copy()
+        if not pending:
+            return
+
+        def fetch_all(tx):
+            return [c.fetch(tx, data_source.bibliotecas_id) for c in pending]
+
+        with driver.session(fetch_size=QUERY_FETCH_SIZE) as session:
+            frames = session.execute_read(fetch_all)
+        # Los ids del grafo pasan al mismo tipo categórico de la encuesta, de modo
+        # que al unir resultados todas las coordenadas comparten sus categorías.
+        # Solo si cada id consultado es una categoría; si no, se perderían ids
+        id_dtype = data_source.df_encuestas["BibliotecaID"].dtype
+        if (
+            isinstance(id_dtype, pd.CategoricalDtype)
+            and (
+                id_dtype.categories.get_indexer_for(data_source.bibliotecas_index) != -1
+            ).all()
+        ):
+            frames = [
+                (
+                    frame.astype({"BibliotecaID": id_dtype})
+                    if "BibliotecaID" in frame.columns
+                    else frame
+                )
+                for frame in frames
+            ]
+        for coordinate, frame in zip(pending, frames):
+            cache_query(driver, type(coordinate), ids, frame)
+            coordinate.prefetched = frame.copy()
+
+    @staticmethod
+    def _run_one(key: str, coordinate, bibliotecas) -> pd.DataFrame:
+        """
+        Calcula el puntaje de una coordenada. Se ejecuta en un hilo del pool, ya que
+        cada coordenada es independiente de las demás.
+
+        Args:
+            key (str): Nombre de la coordenada en coordinates_config.
+            coordinate (AnalysisCoordinate): Coordenada a calcular.
+            bibliotecas: Ids de las bibliotecas a incluir.
+
+        Returns:
+            pd.DataFrame: Resultados de la coordenada.
+        """
+        logger.debug("Processing coordinate: %s", key)
+        try:
+            coordinate_results = coordinate.calculate_score(bibliotecas)
+            logger.info("Successfully processed coordinate: %s", key)
+            return coordinate_results
+        except Exception as e:
+            logger.error("Error processing coordinate %s: %s", key, e)
+            raise
+
+    @staticmethod
+    def _combine(results: pd.DataFrame, frames: list[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Une los resultados de todas las coordenadas a la tabla de bibliotecas.
+
+        Cuando cada BibliotecaID aparece una sola vez y las coordenadas no comparten
+        columnas, cada resultado se alinea al índice de bibliotecas y se concatenan
+        todas las columnas en un solo paso. En otro caso solo los resultados con
+        BibliotecaID repetidos o columnas ya presentes se unen con merges por la
+        izquierda, que conservan las filas repetidas y los sufijos de columnas
+        duplicadas.
+
+        Args:
+            results (pd.DataFrame): Tabla con la columna BibliotecaID.
+            frames (list[pd.DataFrame]): Resultados de cada coordenada.
+
+        Returns:
+            pd.DataFrame: Tabla con una columna por cada resultado de coordenada.
+        """
+        columns = [c for frame in frames for c in frame.columns if c != "BibliotecaID"]
+        if (
+            results["BibliotecaID"].is_unique
+            and len(columns) == len(set(columns))
+            and all(frame["BibliotecaID"].is_unique for frame in frames)
+        ):
+            index = pd.Index(results["BibliotecaID"], name="BibliotecaID")
+            aligned = [results.set_index("BibliotecaID")] + [
+                frame.set_index("BibliotecaID").reindex(index) for frame in frames
+            ]
+            return pd.concat(aligned, axis=1).reset_index()
+
+        # Los resultados con un BibliotecaID por fila y sin columnas repetidas se
+        # alinean por reindex y se agregan juntos con un solo concat; los demás
+        # necesitan el merge, que repite filas y agrega sufijos
+        pending, columns = [], set(results.columns)
+        for frame in frames:
+            new_columns = set(frame.columns) - {"BibliotecaID"}
+            if frame["BibliotecaID"].is_unique and not new_columns & columns:
+                pending.append(frame)
+            else:
+                results = OperationalizationTransformer._join_unique(results, pending)
+                pending = []
+                results = results.merge(frame, on="BibliotecaID", how="left")
+            columns = set(results.columns).union(*(f.columns for f in pending))
+        return OperationalizationTransformer._join_unique(results, pending)
+
+    @staticmethod
+    def _join_unique(results: pd.DataFrame, frames: list[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Equivale a encadenar merges por la izquierda con `frames`, cuando cada uno
+        tiene un BibliotecaID por fila y no comparte columnas con `results`.
+        """
+        if not frames:
+            return results
+        keys = results["BibliotecaID"]
+        aligned = [
+            frame.set_index("BibliotecaID").reindex(keys).set_axis(results.index)
+            for frame in frames
+        ]
+        return pd.concat([results, *aligned], axis=1)
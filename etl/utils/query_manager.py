@@ -2,40 +2,72 @@ class Neo4JQueryManager:
 
     @staticmethod
     def infraestructura_tecnologica():
-        return """MATCH (b:BibliotecaComunitaria)
-        OPTIONAL MATCH (b)-[r1:TIENE_TECNOLOGIA]->(t1:Tipos_Tecnologia)
-        OPTIONAL MATCH (b)-[r2:USA_TECNOLOGIA]->(t2:Tecnologia) 
-        RETURN 
-            b.id AS BibliotecaID, 
-            b.nombre AS BibliotecaNombre, 
-            CASE WHEN t1.nombre = "computadores" THEN true ELSE false END AS tieneComputador,
-            t2.conectividad AS tieneConectividad
+        return """UNWIND $ids AS id
+        MATCH (b:BibliotecaComunitaria {id: id})
+        OPTIONAL MATCH (b)-[r1:TIENE_TECNOLOGIA]->(t1:Tipos_Tecnologia {nombre: "computadores"})
+        OPTIONAL MATCH (b)-[r2:USA_TECNOLOGIA]->(t2:Tecnologia)
+        RETURN
+            b.id AS BibliotecaID,
+            b.nombre AS BibliotecaNombre,
+            count(t1) > 0 AS tieneComputador,
+            head(collect(t2.conectividad)) AS tieneConectividad
         """
 
     @staticmethod
     def diversidad_colecciones():
         return """
-        MATCH (b:BibliotecaComunitaria)-[:CONTIENE_TIPO]->(c:Tipos_Coleccion)
+        UNWIND $ids AS id
+        MATCH (b:BibliotecaComunitaria {id: id})-[:CONTIENE_TIPO]->(c:Tipos_Coleccion)
         RETURN b.id AS BibliotecaID, collect(DISTINCT c.nombre) AS tipos_coleccion
         """
 
     @staticmethod
     def cantidad_inventario():
         return """
-        MATCH (b:BibliotecaComunitaria)-[r:TIENE_COLECCION]->(c:Coleccion)
+        UNWIND $ids AS id
+        MATCH (b:BibliotecaComunitaria {id: id})-[r:TIENE_COLECCION]->(c:Coleccion)
         RETURN b.id AS BibliotecaID, c.cantidad_inventario AS cantidad_inventario
         """
 
     @staticmethod
     def diversidad_servicios():
         return """
-        MATCH (b:BibliotecaComunitaria)-[:OFRECE_SERVICIO]->(s:Servicio)
-        RETURN b.id AS BibliotecaID, collect(DISTINCT s.tipo) AS servicios
+        UNWIND $ids AS id
+        MATCH (b:BibliotecaComunitaria {id: id})-[:OFRECE_SERVICIO]->(s:Servicio)
+        RETURN b.id AS BibliotecaID, count(DISTINCT s.tipo) AS num_servicios
         """
 
     @staticmethod
     def tipos_coleccion():
         return """
-        MATCH (b:BibliotecaComunitaria)-[:TIENE_COLECCION]->(c:Coleccion)
-        RETURN b.id AS BibliotecaID, collect(DISTINCT c.tipo) AS tipos_coleccion
+        UNWIND $ids AS id
+        MATCH (b:BibliotecaComunitaria {id: id})-[:TIENE_COLECCION]->(c:Coleccion)
+        RETURN b.id AS BibliotecaID, count(DISTINCT c.tipo) AS num_tipos_coleccion
+        """
+
+    @staticmethod
+    def create_bibliotecas_batch():
+        return """
+        UNWIND $rows AS r
+        CREATE (b:BibliotecaComunitaria {id: r.id})
+        SET b += r
+        """
+
+    @staticmethod
+    def merge_and_link_nodes_batch(label, relationship, keys):
+        props = ", ".join(f"{key}: r.props.{key}" for key in keys)
+        return f"""
+        UNWIND $rows AS r
+        MATCH (b:BibliotecaComunitaria {{id: r.id}})
+        MERGE (n:{label} {{{props}}})
+        CREATE (b)-[:{relationship}]->(n)
+        """
+
+    @staticmethod
+    def merge_and_link_tipos_batch(label, relationship):
+        return f"""
+        UNWIND $rows AS r
+        MATCH (b:BibliotecaComunitaria {{id: r.id}})
+        MERGE (t:{label} {{nombre: r.nombre}})
+        MERGE (b)-[:{relationship}]->(t)
         """
@@ -13,6 +13,8 @@ SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 SAMPLE_SPREADSHEET_ID = os.getenv("SAMPLE_SPREADSHEET_ID")
 SAMPLE_RANGE_NAME = "gpt!A1"
 CREDENTIALS_FILE = os.getenv("CREDENTIALS_GOOGLE_API")
+# Filas enviadas en cada solicitud de add_csv_to_sheet
+ROWS_PER_REQUEST = 5000
 
 
 class GoogleSheet:
@@ -23,30 +25,34 @@ class GoogleSheet:
         self.spreadsheet_id = spreadsheet_id
 
     def add_csv_to_sheet(self, df, range_name, add_headers=False):
-        # Convierte el DataFrame a lista de listas
-        data = df.values.tolist()
-
-        if add_headers:
-            # Agrega los nombres de las columnas del DataFrame a la lista de datos
-            data.insert(0, df.columns.tolist())
-
-        # Construye el cuerpo para la solicitud de actualización
-        body = {"values": data}
-
-        # Llama a la API de Sheets para escribir los datos en la hoja
-        result = (
-            self.service.spreadsheets()
-            .values()
-            .append(
-                spreadsheetId=self.spreadsheet_id,
-                range=range_name,
-                valueInputOption="USER_ENTERED",
-                body=body,
+        # Envía el DataFrame en bloques de ROWS_PER_REQUEST filas, para no pasar el
+        # límite de cada solicitud ni tener todo el DataFrame como listas a la vez.
+        # Cada append continúa después de las filas del bloque anterior
+        for start in range(0, max(len(df), 1), ROWS_PER_REQUEST):
+            # Convierte el bloque del DataFrame a lista de listas
+            block = df.iloc[start : start + ROWS_PER_REQUEST].to_numpy(dtype=object)
+
+            # Construye el cuerpo para la solicitud de actualización; los nombres de
+            # las columnas van como primera fila del primer bloque
+            if add_headers and start == 0:
+                body = {"values": [df.columns.tolist(), *block.tolist()]}
+            else:
+                body = {"values": block.tolist()}
+
+            # Llama a la API de Sheets para escribir los datos en la hoja
+            result = (
+                self.service.spreadsheets()
+                .values()
+                .append(
+                    spreadsheetId=self.spreadsheet_id,
+                    range=range_name,
+                    valueInputOption="USER_ENTERED",
+                    body=body,
+                )
+                .execute()
             )
-            .execute()
-        )
 
-        print("{0} celdas actualizadas.".format(result.get("updatedCells")))
+            print("{0} celdas actualizadas.".format(result.get("updatedCells")))
 
     def read_sheet_to_df(self, range_name):
         # Llama a la API de Sheets para leer los datos de la hoja
@@ -63,8 +69,9 @@ class GoogleSheet:
         if not values:
             print("No data found.")
         else:
-            # Convierte la lista de listas a DataFrame
-            df = pd.DataFrame(values[1:], columns=values[0])
+            # Convierte la lista de listas a DataFrame; las filas que la API devuelve
+            # más cortas (celdas vacías al final) se completan con None
+            df = pd.DataFrame.from_records(values[1:], columns=values[0])
             return df
 
 
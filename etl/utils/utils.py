@@ -1,12 +1,75 @@
+import atexit
 import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
 from csv import DictReader
 from datetime import datetime
-from pandas import get_dummies, concat
+import numpy as np
+from pandas import (
+    DataFrame,
+    Series,
+    concat,
+    factorize,
+    read_csv,
+    to_datetime,
+    to_numeric,
+)
+from pandas.api.types import is_numeric_dtype
+from pandas.arrays import SparseArray
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pyarrow es opcional; sin él se usan los métodos .str de pandas
+    pa = pc = None
+
+try:
+    from scipy import sparse
+except ImportError:  # scipy es opcional; sin él el One-Hot se arma columna por columna
+    sparse = None
+
+
+# Un QueueHandler por archivo de log, compartido por todos los loggers que escriben
+# en él; su QueueListener hace la escritura en un hilo aparte
+_QUEUE_HANDLERS: dict[str, QueueHandler] = {}
+_QUEUE_HANDLERS_LOCK = threading.Lock()
+
+
+def _queue_handler(log_filename: str) -> QueueHandler:
+    with _QUEUE_HANDLERS_LOCK:
+        handler = _QUEUE_HANDLERS.get(log_filename)
+        if handler is not None:
+            return handler
+
+        formatter = logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        )
+
+        # File handler
+        file_handler = logging.FileHandler(log_filename)
+        file_handler.setFormatter(formatter)
+
+        # Console handler
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, file_handler, console_handler)
+        listener.start()
+        atexit.register(listener.stop)
+
+        handler = QueueHandler(log_queue)
+        _QUEUE_HANDLERS[log_filename] = handler
+        return handler
 
 
 def setup_logger(log_filename: str, logger_name: str = None) -> logging.Logger:
     """
-    Creates a logger with both file and console handlers
+    Creates a logger that writes to a log file and to the console
+
+    Records are queued and written by a background thread, and every logger that
+    uses the same log file shares one file handle.
 
     Args:
         log_filename: Name of the log file to write to
@@ -22,46 +85,78 @@ def setup_logger(log_filename: str, logger_name: str = None) -> logging.Logger:
         return logger
 
     logger.setLevel(logging.INFO)
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-
-    # File handler
-    file_handler = logging.FileHandler(log_filename)
-    file_handler.setFormatter(formatter)
-
-    # Console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    logger.addHandler(_queue_handler(log_filename))
 
     return logger
 
 
 def extract_csv(ruta_archivo: str) -> list[dict]:
-    logging.info(f"Reading CSV file from: {ruta_archivo}")
+    logging.info("Reading CSV file from: %s", ruta_archivo)
     try:
         with open(ruta_archivo, "r", encoding="utf-8") as archivo:
             lector = DictReader(archivo)
             data = list(lector)
-            logging.info(f"Successfully read {len(data)} rows from CSV")
+            logging.info("Successfully read %d rows from CSV", len(data))
             return data
     except Exception as e:
-        logging.error(f"Error reading" f" CSV file: {str(e)}")
+        logging.error("Error reading CSV file: %s", e)
+        raise
+
+
+def extract_csv_frame(ruta_archivo: str) -> DataFrame:
+    """
+    Lee el CSV en columnas en lugar de un diccionario por fila. Todos los valores
+    se leen como texto y las celdas vacías quedan como "", igual que en
+    extract_csv. Usa el lector de pyarrow cuando está instalado.
+
+    Args:
+        ruta_archivo (str): Ruta del archivo CSV.
+
+    Returns:
+        DataFrame: Una columna por encabezado del archivo.
+    """
+    logging.info("Reading CSV file from: %s", ruta_archivo)
+    try:
+        data = read_csv(
+            ruta_archivo,
+            engine="pyarrow" if pa is not None else "c",
+            dtype=str,
+            keep_default_na=False,
+            encoding="utf-8",
+        )
+        logging.info("Successfully read %d rows from CSV", len(data))
+        return data
+    except Exception as e:
+        logging.error("Error reading CSV file: %s", e)
         raise
 
 
 def parsear_fecha(cadena_fecha):
     try:
+        # Caso habitual dd/mm/aaaa: se reordena por posición y datetime solo valida
+        # la fecha; otros formatos que acepta strptime (p. ej. 1/2/2020) y los
+        # años menores a 1000 siguen por strptime
+        if (
+            len(cadena_fecha) == 10
+            and cadena_fecha[2] == cadena_fecha[5] == "/"
+            and cadena_fecha.isascii()
+            and cadena_fecha.replace("/", "").isdigit()
+            and cadena_fecha[6] != "0"
+        ):
+            dia, mes, anio = cadena_fecha[:2], cadena_fecha[3:5], cadena_fecha[6:]
+            datetime(int(anio), int(mes), int(dia))
+            return f"{anio}-{mes}-{dia}"
         return datetime.strptime(cadena_fecha, "%d/%m/%Y").strftime("%Y-%m-%d")
     except ValueError:
         return None
 
 
+VALORES_VERDADEROS = frozenset({"sí", "si", "yes", "true", "1"})
+
+
 def a_bool(valor):
-    return valor.lower() in ("sí", "si", "yes", "true", "1")
+    # Los valores ya en minúsculas se resuelven sin crear la cadena de lower()
+    return valor in VALORES_VERDADEROS or valor.lower() in VALORES_VERDADEROS
 
 
 def a_float(valor):
@@ -78,6 +173,43 @@ def a_int(valor):
         return None
 
 
+# Versiones por columna de los conversores anteriores, para no llamarlos valor
+# por valor sobre un CSV completo
+
+
+def columna_a_fecha(columna: Series) -> Series:
+    """Como parsear_fecha sobre toda la columna; las fechas inválidas quedan en NaN."""
+    fechas = to_datetime(columna, format="%d/%m/%Y", errors="coerce")
+    return fechas.dt.strftime("%Y-%m-%d")
+
+
+def columna_a_bool(columna: Series) -> Series:
+    """
+    Como a_bool sobre toda la columna. Se pasa a texto primero para aceptar
+    columnas numéricas o vacías, que no tienen el accesor .str.
+    """
+    return columna.astype("string").str.lower().isin(VALORES_VERDADEROS)
+
+
+def columna_a_float(columna: Series) -> Series:
+    """Como a_float sobre toda la columna; los valores no numéricos quedan en NaN."""
+    return to_numeric(columna, errors="coerce")
+
+
+def columna_a_int(columna: Series) -> Series:
+    """
+    Como a_int sobre toda la columna, con el tipo entero nulable Int64. Las
+    columnas numéricas se truncan como int(); las demás se pasan a texto primero,
+    así que una columna vacía de floats también se acepta.
+    """
+    if is_numeric_dtype(columna):
+        valores = columna.astype("float64")
+        return np.trunc(valores).where(np.isfinite(valores)).astype("Int64")
+    texto = columna.astype("string")
+    enteros = texto.where(texto.str.fullmatch(r"\s*[+-]?\d+\s*", na=False))
+    return to_numeric(enteros, errors="coerce").astype("Int64")
+
+
 def one_hot_encode_categories(df, column_name):
     """
     Realiza One-Hot Encoding de una columna que contiene listas de categorías.
@@ -89,8 +221,34 @@ def one_hot_encode_categories(df, column_name):
     Returns:
     pd.DataFrame: DataFrame con las columnas adicionales correspondientes al One-Hot Encoding.
     """
-    # Generar el One-Hot Encoding usando pandas.get_dummies
-    categories = get_dummies(df[column_name].explode()).groupby(level=0).sum()
+    # Cada término aparece una vez por lista; los pares (fila, código del término)
+    # forman una matriz dispersa, con memoria proporcional a los pares y no a
+    # filas x categorías. Los pares repetidos se suman, como en un conteo
+    terms = df[column_name].reset_index(drop=True).explode()
+    codes, uniques = factorize(terms, sort=True)
+    found = codes >= 0
+    rows, codes = terms.index.to_numpy()[found], codes[found]
+    shape = (len(df), len(uniques))
+
+    if sparse is not None:
+        matrix = sparse.coo_matrix(
+            (np.ones(len(rows), dtype=np.int64), (rows, codes)), shape=shape
+        ).tocsc()
+        categories = DataFrame.sparse.from_spmatrix(
+            matrix, index=df.index, columns=uniques
+        )
+    else:
+        # Sin scipy: una columna densa temporal por categoría, que se guarda
+        # dispersa antes de pasar a la siguiente
+        orden = np.argsort(codes, kind="stable")
+        limites = np.searchsorted(codes[orden], np.arange(len(uniques) + 1))
+        columnas = {}
+        for code, termino in enumerate(uniques):
+            columna = np.bincount(
+                rows[orden[limites[code] : limites[code + 1]]], minlength=shape[0]
+            )
+            columnas[termino] = SparseArray(columna, fill_value=0)
+        categories = DataFrame(columnas, index=df.index, columns=uniques)
     return concat([df.drop(columns=[column_name]), categories], axis=1)
 
 def normalize_and_clean_nominal_categories(column):
@@ -108,10 +266,21 @@ def normalize_and_clean_nominal_categories(column):
     Returns:
     pd.Series: Columna normalizada con las variables categoricas nominales .
     """
-    return (
-        column.str.lower()
-        .str.replace(r"[^\w\s,]", "", regex=True)
-        .str.replace(" ", "_")
-        .str.split(",")
-        .apply(lambda lst: [term.strip("_") for term in lst])
-    )
+    if pc is None:
+        return (
+            column.str.lower()
+            .str.replace(r"[^\w\s,]", "", regex=True)
+            .str.replace(" ", "_")
+            .str.split(",")
+            .apply(lambda lst: [term.strip("_") for term in lst])
+        )
+
+    # Mismos pasos con los kernels de pyarrow. RE2 solo reconoce \w y \s ASCII,
+    # por eso las letras y números Unicode se nombran con \p{L} y \p{N}
+    texto = pc.utf8_lower(pa.array(column, type=pa.string()))
+    texto = pc.replace_substring_regex(texto, r"[^\p{L}\p{N}_\s\p{Z},]", "")
+    texto = pc.replace_substring(texto, " ", "_")
+    listas = pc.split_pattern(texto, ",")
+    terminos = pc.utf8_trim(listas.flatten(), "_")
+    listas = pa.ListArray.from_arrays(listas.offsets, terminos, mask=listas.is_null())
+    return Series(listas.to_pylist(), index=column.index, name=column.name)
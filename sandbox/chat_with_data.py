@@ -1,14 +1,113 @@
+import hashlib
 import os
+import shelve
+import time
 
+import numpy as np
 from langchain.chains import GraphCypherQAChain
 from langchain_community.graphs import Neo4jGraph
-from langchain_openai import ChatOpenAI
-
-
-def save_qa_to_file(question, answer, file_path):
-    with open(file_path, "a", encoding="utf-8") as f:
-        f.write(f"Pregunta: {question}\n")
-        f.write(f"Respuesta: {answer}\n\n")
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+TEMPERATURE = 0
+# El nivel semántico puede devolver la respuesta de una pregunta parecida pero
+# distinta (p. ej. otra localidad), así que está apagado por defecto
+SEMANTIC_CACHE = False
+# Las respuestas guardadas caducan después de un día
+CACHE_MAX_AGE = 24 * 60 * 60
+
+
+class QACache:
+    """
+    Caché persistente de respuestas en dos niveles: primero la pregunta exacta
+    (sha256 de la pregunta normalizada) y, si se pasan `embeddings`, la pregunta
+    guardada más parecida cuando la similitud coseno llega a `min_similarity`.
+    Al abrirla se descartan las entradas de más de `max_age` segundos o de otra
+    `version` del grafo, para que una recarga no deje respuestas viejas.
+    """
+
+    def __init__(
+        self,
+        file_path,
+        embeddings=None,
+        min_similarity=0.95,
+        max_age=CACHE_MAX_AGE,
+        version="",
+    ):
+        self.store = shelve.open(file_path)
+        self.embeddings = embeddings
+        self.min_similarity = min_similarity
+        self.version = version
+        now = time.time()
+        for key, entry in list(self.store.items()):
+            if (
+                entry.get("version") != version
+                or now - entry.get("saved_at", 0) > max_age
+            ):
+                del self.store[key]
+        entries = [
+            entry for entry in self.store.values() if entry["embedding"] is not None
+        ]
+        self.questions = [entry["question"] for entry in entries]
+        self.answers = [entry["answer"] for entry in entries]
+        self.vectors = [entry["embedding"] for entry in entries]
+
+    @staticmethod
+    def key(question):
+        return hashlib.sha256(question.strip().lower().encode("utf-8")).hexdigest()
+
+    def embed(self, question):
+        """Embedding normalizado de la pregunta, o None si no se puede calcular."""
+        if self.embeddings is None:
+            return None
+        try:
+            embedding = np.asarray(self.embeddings.embed_query(question), dtype=float)
+        except Exception as e:
+            print(f"No se pudo calcular el embedding de la pregunta: {e}")
+            return None
+        norm = np.linalg.norm(embedding)
+        if not norm > 0:
+            return None
+        return embedding / norm
+
+    def lookup(self, question):
+        """
+        Devuelve (respuesta, pregunta parecida, embedding de la pregunta). La
+        respuesta es None si no hay una guardada; la pregunta parecida solo se
+        da cuando la respuesta viene del nivel semántico, para mostrársela al
+        usuario.
+        """
+        entry = self.store.get(self.key(question))
+        if entry is not None:
+            return entry["answer"], None, entry["embedding"]
+
+        embedding = self.embed(question)
+        if embedding is not None and self.vectors:
+            similarities = np.vstack(self.vectors) @ embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.min_similarity:
+                return self.answers[best], self.questions[best], embedding
+        return None, None, embedding
+
+    def save(self, question, embedding, answer):
+        self.store[self.key(question)] = {
+            "question": question,
+            "embedding": embedding,
+            "answer": answer,
+            "version": self.version,
+            "saved_at": time.time(),
+        }
+        if embedding is not None:
+            self.questions.append(question)
+            self.answers.append(answer)
+            self.vectors.append(embedding)
+
+    def close(self):
+        self.store.close()
+
+
+def save_qa_to_file(question, answer, f):
+    f.write(f"Pregunta: {question}\n")
+    f.write(f"Respuesta: {answer}\n\n")
 
 
 def get_user_input():
@@ -29,24 +128,51 @@ def main():
     )
 
     chain = GraphCypherQAChain.from_llm(
-        ChatOpenAI(temperature=0, model="gpt-4o-mini-2024-07-18"),
+        ChatOpenAI(temperature=TEMPERATURE, model="gpt-4o-mini-2024-07-18"),
         graph=graph,
         verbose=True,
     )
 
     qa_file = "qa_history.txt"
+    # Solo una cadena determinista puede reutilizar respuestas anteriores
+    # GRAPH_VERSION se cambia al recargar el grafo para invalidar la caché
+    cache = (
+        QACache(
+            "qa_cache",
+            OpenAIEmbeddings() if SEMANTIC_CACHE else None,
+            version=os.getenv("GRAPH_VERSION", ""),
+        )
+        if TEMPERATURE == 0
+        else None
+    )
 
-    while True:
-        question = get_user_input()
-        if question.lower() == "salir":
-            break
-
+    # El historial se abre una sola vez, con buffer de línea
+    with open(qa_file, "a", encoding="utf-8", buffering=1) as f:
         try:
-            answer = chain.invoke(question)
-            print(f"Respuesta: {answer['result']}")
-            save_qa_to_file(question, answer["result"], qa_file)
-        except Exception as e:
-            print(f"Error al procesar la pregunta: {e}")
+            while True:
+                question = get_user_input()
+                if question.lower() == "salir":
+                    break
+
+                try:
+                    result, similar_question, embedding = (
+                        cache.lookup(question)
+                        if cache is not None
+                        else (None, None, None)
+                    )
+                    if similar_question is not None:
+                        print(f"(Respuesta guardada para: {similar_question})")
+                    if result is None:
+                        result = chain.invoke(question)["result"]
+                        if cache is not None:
+                            cache.save(question, embedding, result)
+                    print(f"Respuesta: {result}")
+                    save_qa_to_file(question, result, f)
+                except Exception as e:
+                    print(f"Error al procesar la pregunta: {e}")
+        finally:
+            if cache is not None:
+                cache.close()
 
     print(f"Las preguntas y respuestas han sido guardadas en {qa_file}")
 
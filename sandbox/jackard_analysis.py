@@ -20,6 +20,11 @@ class Neo4jConnection:
             result = session.run(query)
             return [dict(record) for record in result]
 
+    def query_df(self, query):
+        # Arma el DataFrame directamente desde el resultado, sin pasar por dicts
+        with self._driver.session() as session:
+            return session.run(query).to_df()
+
 
 # --- 2. Función para obtener los datos de las bibliotecas ---
 def fetch_bibliotecas_data(conn):
@@ -41,8 +46,7 @@ def fetch_bibliotecas_data(conn):
         p.Atiende34_poblacion_jovenes AS Atiende34_poblacion_jovenes,
         i.AccesibilidadCatalogoComunidad AS AccesibilidadCatalogoComunidad
     """
-    data = conn.query(query)
-    return pd.DataFrame(data)
+    return conn.query_df(query)
 
 
 # --- 3. Normalización de los datos ---
@@ -2,7 +2,41 @@ import numpy as np
 import networkx as nx
 
 from abc import ABC, abstractmethod
-from pandas import DataFrame, Series, isnull
+from pandas import DataFrame, Series, factorize, isnull
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba es opcional; sin él se usa la versión por bloques de NumPy
+    njit = None
+
+
+# Filas de la matriz de similitud calculadas a la vez en GowerSimilarity.weighted_similarity
+GOWER_BLOCK_ROWS = 256
+
+
+if njit is not None:
+
+    @njit(parallel=True, cache=True)
+    def _gower_kernel(num_data, num_ranges, num_weights, cat_codes, cat_weights, out):
+        """
+        Suma ponderada de las similitudes numéricas y categóricas de cada par de
+        filas en una sola pasada, sin arreglos intermedios. Cada hilo calcula la
+        fila i desde la diagonal y refleja el valor en out[j, i].
+        """
+        n = num_data.shape[0]
+        for i in prange(n):
+            for j in range(i, n):
+                s = 0.0
+                for k in range(num_data.shape[1]):
+                    s += num_weights[k] * (1.0 - abs(num_data[i, k] - num_data[j, k]) / num_ranges[k])
+                for k in range(cat_codes.shape[1]):
+                    if cat_codes[i, k] == cat_codes[j, k]:
+                        s += cat_weights[k]
+                out[i, j] = s
+                out[j, i] = s
+
+else:
+    _gower_kernel = None
 
 
 class SimilarityStrategy(ABC):
@@ -89,7 +123,8 @@ class SimilarityStrategy(ABC):
             feature_ranges = df[num_cols].max() - df[num_cols].min()
             feature_ranges[feature_ranges == 0] = 1  # Avoid division by zero
 
-        num_data = df[num_cols].values
+        # Fila por fila en memoria (orden C), que es como se recorren los pares
+        num_data = np.ascontiguousarray(df[num_cols].to_numpy(dtype=float, na_value=np.nan))
         num_ranges = feature_ranges.values if isinstance(feature_ranges, Series) else np.array(list(feature_ranges.values()))
 
         return num_data, num_ranges
@@ -115,6 +150,14 @@ class GowerSimilarity(SimilarityStrategy):
         calculate: Calcula la matriz de similitud de Gower
     """
 
+    # Estrategias de ponderación que necesitan las similitudes por característica
+    SIMILARITY_ENTROPY_STRATEGIES = (
+        'similarity_entropy',
+        'inverse_similarity_entropy',
+        'similarity_entropy_normalized',
+        'inverse_similarity_entropy_normalized',
+    )
+
     @staticmethod
     def compute_entropy(data, method='fd'):
         """Calcula la entropía de los datos usando estimación basada en histogramas.
@@ -267,7 +310,7 @@ class GowerSimilarity(SimilarityStrategy):
             entropies = GowerSimilarity.compute_column_entropies(df)
             entropy_weights = np.array([entropies.get(col, 0) for col in df.columns])
             return entropy_weights
-        elif weighting_strategy in ['similarity_entropy', 'inverse_similarity_entropy', 'similarity_entropy_normalized', 'inverse_similarity_entropy_normalized']:
+        elif weighting_strategy in GowerSimilarity.SIMILARITY_ENTROPY_STRATEGIES:
             # Compute entropies over similarity layers
             if all_sim is None:
                 raise ValueError("all_sim must be provided when using similarity entropy-based weighting strategies.")
@@ -295,6 +338,24 @@ class GowerSimilarity(SimilarityStrategy):
         else:
             raise ValueError(f"Unknown weighting strategy: {weighting_strategy}")
 
+    @staticmethod
+    def multi_label_matrix(column: Series):
+        """
+        Build the binary row x label matrix of a multi-label column in one pass.
+        Labels are sorted; missing values and empty lists give all-zero rows.
+
+        :param column: pandas Series whose values are lists of labels.
+        :return: NumPy int array of shape (len(column), number of labels).
+        """
+        # Each (row, label) pair is one exploded entry; the label codes give the
+        # column of the matrix and the entries without a label (NaN) are skipped
+        labels = column.reset_index(drop=True).explode()
+        codes, uniques = factorize(labels, sort=True)
+        found = codes >= 0
+        ml_binary_matrix = np.zeros((len(column), len(uniques)), dtype=int)
+        ml_binary_matrix[labels.index.to_numpy()[found], codes[found]] = 1
+        return ml_binary_matrix
+
     @staticmethod
     def calculate(df: DataFrame, feature_ranges=None, weights=None, nan_strategy="ignore", weighting_strategy='uniform'):
         """
@@ -315,31 +376,17 @@ class GowerSimilarity(SimilarityStrategy):
         # Process numerical data
         num_data, num_ranges = GowerSimilarity.normalize_features(df[num_cols], feature_ranges)
 
-        # Process single-label categorical data
+        # Process single-label categorical data, as integer codes per column: two
+        # values are equal exactly when their codes are
         if cat_cols:
-            cat_data = df[cat_cols].astype(str).values
-            # Compute categorical similarities
-            cat_sim = (cat_data[:, None, :] == cat_data[None, :, :]).astype(float)
+            cat_data = np.column_stack([factorize(df[col].astype(str))[0] for col in cat_cols])
         else:
-            cat_sim = np.zeros((n, n, 0))
+            cat_data = np.empty((n, 0), dtype=np.int64)
 
         # Process multi-label categorical data
         ml_similarity_matrices = []
         for col in multi_label_cols:
-            # Get all unique labels
-            all_labels = set()
-            for labels in df[col].dropna():
-                all_labels.update(labels)
-            all_labels = sorted(all_labels)
-            label_to_index = {label: idx for idx, label in enumerate(all_labels)}
-            num_labels = len(all_labels)
-            ml_binary_matrix = np.zeros((len(df), num_labels), dtype=int)
-            for i, labels in enumerate(df[col]):
-                if isnull(labels):
-                    continue  # Or handle missing values appropriately
-                for label in labels:
-                    idx = label_to_index[label]
-                    ml_binary_matrix[i, idx] = 1
+            ml_binary_matrix = GowerSimilarity.multi_label_matrix(df[col])
             # Compute cosine similarity
             norms = np.linalg.norm(ml_binary_matrix, axis=1)
             norms[norms == 0] = 1  # Avoid division by zero
@@ -348,39 +395,83 @@ class GowerSimilarity(SimilarityStrategy):
             # Add a new axis to stack later
             ml_similarity_matrices.append(sim_matrix[..., np.newaxis])
 
-        # Compute numerical similarities
-        if num_cols:
-            num_diff = np.abs(num_data[:, None, :] - num_data[None, :, :]) / num_ranges
-            num_sim = 1 - num_diff
-        else:
-            num_sim = np.zeros((n, n, 0))
-
-        # Concatenate all similarities
-        similarity_layers = [num_sim, cat_sim] + ml_similarity_matrices
-        all_sim = np.concatenate(similarity_layers, axis=2)
-
-        # Initialize weights
         columns = num_cols + cat_cols + multi_label_cols
-        weights_array = GowerSimilarity.initialize_weights(df[columns], weights, weighting_strategy, all_sim=all_sim)
+        if not weights and weighting_strategy in GowerSimilarity.SIMILARITY_ENTROPY_STRATEGIES:
+            # These weights come from the per-feature similarities themselves, so the
+            # full n x n x features tensor has to be built
+            all_sim = GowerSimilarity.similarity_layers(num_data, num_ranges, cat_data, ml_similarity_matrices)
+            weights_array = GowerSimilarity.initialize_weights(df[columns], weights, weighting_strategy, all_sim=all_sim)
+        else:
+            all_sim = None
+            weights_array = GowerSimilarity.initialize_weights(df[columns], weights, weighting_strategy)
 
         # Ensure weights_array is the same length as the number of features
-        if weights_array.shape[0] != all_sim.shape[2]:
+        if weights_array.shape[0] != len(columns):
             raise ValueError("Length of weights_array does not match number of features.")
 
-        # Apply weights to similarities
-        weighted_sim = all_sim * weights_array
-
         # Compute the total weight (sum of weights)
         total_weight = np.sum(weights_array)
 
         # Handle case where total weight is zero
         if total_weight == 0:
             return np.zeros((n, n))
-        else:
+        if all_sim is not None:
             # Sum over features and normalize by total weight
-            return np.sum(weighted_sim, axis=2) / total_weight
+            return np.sum(all_sim * weights_array, axis=2) / total_weight
+        return GowerSimilarity.weighted_similarity(num_data, num_ranges, cat_data, ml_similarity_matrices, weights_array) / total_weight
 
+    @staticmethod
+    def similarity_layers(num_data, num_ranges, cat_data, ml_similarity_matrices):
+        """
+        Stack the per-feature similarities into an n x n x features tensor, in the
+        order numerical, categorical, multi-label.
+        """
+        n = len(num_data)
+        num_sim = 1 - np.abs(num_data[:, None, :] - num_data[None, :, :]) / num_ranges
+        cat_sim = (cat_data[:, None, :] == cat_data[None, :, :]).astype(float)
+        return np.concatenate([num_sim.reshape(n, n, -1), cat_sim.reshape(n, n, -1)] + ml_similarity_matrices, axis=2)
 
+    @staticmethod
+    def weighted_similarity(num_data, num_ranges, cat_data, ml_similarity_matrices, weights_array, block_rows=GOWER_BLOCK_ROWS):
+        """
+        Weighted sum over features of the per-feature similarities, without the
+        n x n x features tensor. With numba installed the numerical and categorical
+        parts run in the parallel _gower_kernel; otherwise rows are processed in
+        blocks of `block_rows`, so only a block_rows x n x features slice exists at
+        a time and each block is reduced straight into the n x n result.
+
+        :return: NumPy array (n x n) with the weighted sum, not yet normalized.
+        """
+        n = len(num_data)
+        num_weights = weights_array[: num_data.shape[1]]
+        cat_weights = weights_array[num_data.shape[1] : num_data.shape[1] + cat_data.shape[1]]
+        ml_weights = weights_array[num_data.shape[1] + cat_data.shape[1] :]
+
+        result = np.zeros((n, n))
+        if _gower_kernel is not None:
+            _gower_kernel(
+                num_data,
+                np.asarray(num_ranges, dtype=np.float64),
+                np.asarray(num_weights, dtype=np.float64),
+                cat_data,
+                np.asarray(cat_weights, dtype=np.float64),
+                result,
+            )
+        else:
+            # Invariantes entre bloques: se calculan una sola vez
+            num_scaled_weights = num_weights / num_ranges
+            num_weights_sum = num_weights.sum()
+            for start in range(0, n, block_rows):
+                rows = slice(start, start + block_rows)
+                if num_data.shape[1]:
+                    # sum_d w_d * (1 - |x_id - x_jd| / range_d)
+                    num_diff = np.abs(num_data[rows, None, :] - num_data[None, :, :])
+                    result[rows] += num_weights_sum - num_diff @ num_scaled_weights
+                if cat_data.shape[1]:
+                    result[rows] += (cat_data[rows, None, :] == cat_data[None, :, :]) @ cat_weights
+        for sim_matrix, weight in zip(ml_similarity_matrices, ml_weights):
+            result += sim_matrix[..., 0] * weight
+        return result
 
 
 class LayerFactory:
@@ -427,11 +518,17 @@ class LayerFactory:
             # Include all edges without thresholding
             mask = np.triu(np.ones_like(similarity_matrix, dtype=bool), k=1)
 
-        edges = np.column_stack(np.where(mask))
+        rows, cols = np.nonzero(mask)
         weights = similarity_matrix[mask]
 
-        for (i, j), weight in zip(edges, weights):
-            network.add_edge(node_labels[i], node_labels[j], weight=weight)
+        # Aristas en bloque: una lista de tuplas en vez de un add_edge por par
+        labels = tuple(node_labels)
+        network.add_weighted_edges_from(
+            [
+                (labels[i], labels[j], w)
+                for i, j, w in zip(rows.tolist(), cols.tolist(), weights.tolist())
+            ]
+        )
 
         return network
 
@@ -440,8 +537,28 @@ class LayerFactory:
         best_threshold = None
         best_network = None
 
+        # Los pares del triángulo superior se ordenan una vez por similitud; cada
+        # umbral toma los k primeros con una búsqueda binaria, sin volver a
+        # enmascarar la matriz. Un umbral con las mismas aristas que el anterior
+        # da el mismo grafo y la misma modularidad, así que se salta
+        rows, cols = np.triu_indices(len(node_labels), k=1)
+        sims = similarity_matrix[rows, cols]
+        order = np.argsort(-sims, kind="stable")
+        sorted_neg_sims = -sims[order]
+        previous_k = None
+
         for threshold in threshold_range:
-            G = self.create_network(similarity_matrix, threshold, node_labels)
+            k = int(np.searchsorted(sorted_neg_sims, -threshold, side="right"))
+            if k == previous_k:
+                continue
+            previous_k = k
+            # Mismo orden de aristas que create_network (por filas)
+            selected = np.sort(order[:k])
+            G = nx.Graph()
+            G.add_weighted_edges_from(
+                (node_labels[i], node_labels[j], w)
+                for i, j, w in zip(rows[selected], cols[selected], sims[selected])
+            )
             if len(G.edges) > 0:
                 communities = list(nx.community.greedy_modularity_communities(G))
                 modularity = nx.community.modularity(G, communities)
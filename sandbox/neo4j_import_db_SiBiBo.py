@@ -1,8 +1,16 @@
-import csv
+import asyncio
 import logging
-from neo4j import GraphDatabase
-from datetime import datetime
-from etl.utils.query_manager import Neo4JQueryManager
+import numpy as np
+import pandas as pd
+from neo4j import AsyncGraphDatabase
+from neo4j.exceptions import Neo4jError
+from etl.utils.utils import (
+    VALORES_VERDADEROS,
+    columna_a_bool,
+    columna_a_fecha,
+    columna_a_float,
+    columna_a_int,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -13,382 +21,466 @@ logging.basicConfig(
 
 
 def extract_csv(ruta_archivo):
+    """
+    Lee el CSV con el parser en C de pandas, todo como texto y con las celdas
+    vacías como "", igual que csv.DictReader, pero en columnas en lugar de un
+    diccionario por fila.
+    """
     logging.info(f"Reading CSV file from: {ruta_archivo}")
     try:
-        with open(ruta_archivo, "r", encoding="utf-8") as archivo:
-            lector = csv.DictReader(archivo)
-            data = list(lector)
-            logging.info(f"Successfully read {len(data)} rows from CSV")
-            return data
+        data = pd.read_csv(
+            ruta_archivo,
+            dtype=str,
+            keep_default_na=False,
+            encoding="utf-8",
+            engine="c",
+        )
+        logging.info(f"Successfully read {len(data)} rows from CSV")
+        return data
     except Exception as e:
         logging.error(f"Error reading" f" CSV file: {str(e)}")
         raise
 
 
-def parsear_fecha(cadena_fecha):
-    try:
-        return datetime.strptime(cadena_fecha, "%d/%m/%Y").strftime("%Y-%m-%d")
-    except ValueError:
-        return None
-
-
-def a_bool(valor):
-    return valor.lower() in ("sí", "si", "yes", "true", "1")
-
+# Nodos compartidos entre bibliotecas que crear_grafos crea con MERGE por nombre
+ETIQUETAS_UNICAS = (
+    "Localidad",
+    "TipoColeccion",
+    "TipoServicio",
+    "TipoActividad",
+    "TipoTecnologia",
+    "TipoPoblacion",
+    "TipoAliado",
+    "TipoFinanciacion",
+)
 
-def a_float(valor):
-    try:
-        return float(valor)
-    except ValueError:
-        return None
+_TIPOS_COLECCION = (
+    "literatura",
+    "infantiles",
+    "informativos",
+    "texto",
+    "didacticos",
+    "revistas_periodicos",
+    "audiovisuales",
+    "juegos",
+    "digitales",
+    "fanzines",
+    "enfoques",
+    "autoedicion",
+    "otros",
+)
+_TIPOS_SERVICIO = (
+    "consulta",
+    "prestamo_externo",
+    "internet",
+    "leo",
+    "culturales",
+    "alfabetizacion",
+    "comunitarios",
+    "otros",
+)
+_TIPOS_ACTIVIDAD = (
+    "lectoescritura",
+    "culturales",
+    "formacion",
+    "emprendimientos",
+    "produccion_comunitaria",
+    "medioambientales",
+    "psicosociales",
+    "ciencia",
+    "otros",
+)
+_TIPOS_TECNOLOGIA = (
+    "computadores",
+    "impresoras",
+    "tabletas",
+    "proyectores",
+    "smartphones",
+    "ninguno",
+    "otros",
+)
+_TIPOS_POBLACION = (
+    "infancias",
+    "jovenes",
+    "mujeres",
+    "adultos_mayores",
+    "migrantes",
+    "otros",
+)
+_TIPOS_ALIADOS = (
+    "editoriales",
+    "fundaciones",
+    "colectivos",
+    "casa_cultura",
+    "consejo_cultura",
+    "educativos",
+    "bibliotecas_comunitarias",
+    "otros",
+)
+_TIPOS_FINANCIACION = (
+    "autogestion",
+    "estimulos_distrito",
+    "becas",
+    "convocatorias_internacionales",
+    "patrocinios",
+    "otros",
+)
 
+# Prefijo de las columnas booleanas y nombres de cada grupo de tipos
+GRUPOS_TIPOS = {
+    "tipos_coleccion": ("26_tipo_coleccion_", _TIPOS_COLECCION),
+    "tipos_servicio": ("30_servicios_", _TIPOS_SERVICIO),
+    "tipos_actividad": ("31_actividades_", _TIPOS_ACTIVIDAD),
+    "tipos_tecnologia": ("33_tic_", _TIPOS_TECNOLOGIA),
+    "tipos_poblacion": ("34_poblacion_", _TIPOS_POBLACION),
+    "tipos_aliados": ("35_aliados_", _TIPOS_ALIADOS),
+    "tipos_financiacion": ("36_fuentes_financiacion_", _TIPOS_FINANCIACION),
+}
+
+
+# Columnas que se convierten de texto a otro tipo antes de crear los objetos
+COLUMNAS_FECHA = ("1_fecha_registro", "20_inicio_actividades")
+COLUMNAS_FLOAT = ("7_latitud", "8_longitud")
+COLUMNAS_INT = ("24_cantidad_inventario",)
+COLUMNAS_BOOL = (
+    "23_inventario",
+    "27_catalogo",
+    "28_quiere_catalogo",
+    "32_conectividad",
+)
 
-def a_int(valor):
-    try:
-        return int(valor)
-    except ValueError:
-        return None
-
-
-def crear_objetos_neo4j(fila):
-    # Crear nodo BibliotecaComunitaria
-    biblioteca = {
-        "id": fila["2_id"],
-        "nombre": fila["3_nombre_organizacion"],
-        "fecha_registro": parsear_fecha(fila["1_fecha_registro"]),
-        "estado": fila["4_estado"],
-        "inicio_actividades": parsear_fecha(fila["20_inicio_actividades"]),
-        "representante": fila["5_representante"],
-        "telefono": fila["11_telefono"],
-        "correo_electronico": fila["12_correo_electronico"],
-        "whatsapp": fila["17_whatsapp"],
-        "dias_atencion": fila["21_dias_atencion"],
-        "enlace_fotos": fila["22_enlace_fotos"],
-    }
-
-    # Crear nodo Ubicacion
-    ubicacion = {
-        "latitud": a_float(fila["7_latitud"]),
-        "longitud": a_float(fila["8_longitud"]),
-        "barrio": fila["10_barrio"],
-        "direccion": fila["6_direccion"],
-    }
-
-    # Crear nodo Localidad
-    localidad = {"nombre": fila["9_localidad"]}
-
-    # Crear nodo RedesSociales
-    redes_sociales = {
-        "facebook": fila["13_facebook"],
-        "enlace_facebook": fila["14_enlace_facebook"],
-        "instagram": fila["15_instagram"],
-        "enlace_instagram": fila["16_enlace_instagram"],
-        "youtube": fila["18_youtube"],
-        "enlace_youtube": fila["19_enlace_youtube"],
-    }
-
-    # Crear nodo Coleccion
-    coleccion = {
-        "inventario": a_bool(fila["23_inventario"]),
-        "cantidad_inventario": a_int(fila["24_cantidad_inventario"]),
-        "coleccion": fila["25_coleccion"],
-    }
-
-    # Crear TiposColeccion
-    tipos_coleccion = [
-        "literatura",
-        "infantiles",
-        "informativos",
-        "texto",
-        "didacticos",
-        "revistas_periodicos",
-        "audiovisuales",
-        "juegos",
-        "digitales",
-        "fanzines",
-        "enfoques",
-        "autoedicion",
-        "otros",
-    ]
-    nodos_tipos_coleccion = [
-        {"nombre": tc}
-        for tc in tipos_coleccion
-        if a_bool(fila[f"26_tipo_coleccion_{tc}"])
-    ]
 
-    # Crear nodo Catalogo
-    catalogo = {
-        "catalogo": a_bool(fila["27_catalogo"]),
-        "quiere_catalogo": a_bool(fila["28_quiere_catalogo"]),
-    }
-
-    # Crear nodo SoporteCatalogo
-    soporte_catalogo = {"tipo": fila["29_soporte_catalogo"]}
-
-    # Crear TiposServicio
-    tipos_servicio = [
-        "consulta",
-        "prestamo_externo",
-        "internet",
-        "leo",
-        "culturales",
-        "alfabetizacion",
-        "comunitarios",
-        "otros",
-    ]
-    nodos_tipos_servicio = [
-        {"nombre": ts} for ts in tipos_servicio if a_bool(fila[f"30_servicios_{ts}"])
-    ]
+def convertir_columnas(df):
+    """
+    Convierte de una vez, columna por columna, las fechas, números y banderas
+    del CSV, en lugar de hacerlo celda por celda en crear_objetos_neo4j.
+
+    Args:
+        df (pd.DataFrame): Datos crudos del CSV, una fila por biblioteca.
+
+    Returns:
+        pd.DataFrame: Copia con las columnas convertidas a objetos de Python;
+        los valores que no se pudieron convertir quedan como None.
+    """
+    convertidas = df.copy()
+    for columna in COLUMNAS_FECHA:
+        convertidas[columna] = columna_a_fecha(df[columna])
+    for columna in COLUMNAS_FLOAT:
+        convertidas[columna] = columna_a_float(df[columna])
+    for columna in COLUMNAS_INT:
+        convertidas[columna] = columna_a_int(df[columna])
+    for columna in COLUMNAS_BOOL:
+        convertidas[columna] = columna_a_bool(df[columna])
+    convertidas = convertidas.astype(object)
+    return convertidas.where(convertidas.notna(), None)
+
+
+def clasificar_tipos(df):
+    """
+    Clasifica de una sola vez las banderas booleanas de cada grupo de tipos.
+
+    Args:
+        df (pd.DataFrame): Datos crudos del CSV, una fila por biblioteca.
+
+    Returns:
+        list[dict]: Por cada fila, los nombres de los tipos activos en cada grupo.
+    """
+    tipos_por_grupo = {}
+    for grupo, (prefijo, tipos) in GRUPOS_TIPOS.items():
+        columnas = [f"{prefijo}{tipo}" for tipo in tipos]
+        mascara = (
+            df[columnas]
+            .apply(lambda columna: columna.str.lower())
+            .isin(VALORES_VERDADEROS)
+            .to_numpy(dtype=bool)
+        )
+        nombres = np.array(tipos, dtype=object)
+        tipos_por_grupo[grupo] = [nombres[fila].tolist() for fila in mascara]
 
-    # Crear TiposActividad
-    tipos_actividad = [
-        "lectoescritura",
-        "culturales",
-        "formacion",
-        "emprendimientos",
-        "produccion_comunitaria",
-        "medioambientales",
-        "psicosociales",
-        "ciencia",
-        "otros",
-    ]
-    nodos_tipos_actividad = [
-        {"nombre": ta} for ta in tipos_actividad if a_bool(fila[f"31_actividades_{ta}"])
+    return [
+        dict(zip(tipos_por_grupo, tipos_fila))
+        for tipos_fila in zip(*tipos_por_grupo.values())
     ]
 
-    # Crear nodo Tecnologia
-    tecnologia = {"conectividad": a_bool(fila["32_conectividad"])}
-
-    # Crear TiposTecnologia
-    tipos_tecnologia = [
-        "computadores",
-        "impresoras",
-        "tabletas",
-        "proyectores",
-        "smartphones",
-        "ninguno",
-        "otros",
-    ]
-    nodos_tipos_tecnologia = [
-        {"nombre": tt} for tt in tipos_tecnologia if a_bool(fila[f"33_tic_{tt}"])
-    ]
 
-    # Crear TiposPoblacion
-    tipos_poblacion = [
-        "infancias",
-        "jovenes",
-        "mujeres",
-        "adultos_mayores",
-        "migrantes",
-        "otros",
-    ]
-    nodos_tipos_poblacion = [
-        {"nombre": tp} for tp in tipos_poblacion if a_bool(fila[f"34_poblacion_{tp}"])
-    ]
+# Propiedades de cada nodo y columna del CSV de la que sale cada una
+CAMPOS_NODOS = {
+    # Nodo BibliotecaComunitaria
+    "biblioteca": {
+        "id": "2_id",
+        "nombre": "3_nombre_organizacion",
+        "fecha_registro": "1_fecha_registro",
+        "estado": "4_estado",
+        "inicio_actividades": "20_inicio_actividades",
+        "representante": "5_representante",
+        "telefono": "11_telefono",
+        "correo_electronico": "12_correo_electronico",
+        "whatsapp": "17_whatsapp",
+        "dias_atencion": "21_dias_atencion",
+        "enlace_fotos": "22_enlace_fotos",
+    },
+    # Nodo Ubicacion
+    "ubicacion": {
+        "latitud": "7_latitud",
+        "longitud": "8_longitud",
+        "barrio": "10_barrio",
+        "direccion": "6_direccion",
+    },
+    # Nodo Localidad
+    "localidad": {"nombre": "9_localidad"},
+    # Nodo RedesSociales
+    "redes_sociales": {
+        "facebook": "13_facebook",
+        "enlace_facebook": "14_enlace_facebook",
+        "instagram": "15_instagram",
+        "enlace_instagram": "16_enlace_instagram",
+        "youtube": "18_youtube",
+        "enlace_youtube": "19_enlace_youtube",
+    },
+    # Nodo Coleccion
+    "coleccion": {
+        "inventario": "23_inventario",
+        "cantidad_inventario": "24_cantidad_inventario",
+        "coleccion": "25_coleccion",
+    },
+    # Nodo Catalogo
+    "catalogo": {
+        "catalogo": "27_catalogo",
+        "quiere_catalogo": "28_quiere_catalogo",
+    },
+    # Nodo SoporteCatalogo
+    "soporte_catalogo": {"tipo": "29_soporte_catalogo"},
+    # Nodo Tecnologia
+    "tecnologia": {"conectividad": "32_conectividad"},
+}
+
+# Orden de los campos en cada objeto generado
+ORDEN_CAMPOS = (
+    "biblioteca",
+    "ubicacion",
+    "localidad",
+    "redes_sociales",
+    "coleccion",
+    "tipos_coleccion",
+    "catalogo",
+    "soporte_catalogo",
+    "tipos_servicio",
+    "tipos_actividad",
+    "tecnologia",
+    "tipos_tecnologia",
+    "tipos_poblacion",
+    "tipos_aliados",
+    "tipos_financiacion",
+)
 
-    # Crear TiposAliados
-    tipos_aliados = [
-        "editoriales",
-        "fundaciones",
-        "colectivos",
-        "casa_cultura",
-        "consejo_cultura",
-        "educativos",
-        "bibliotecas_comunitarias",
-        "otros",
-    ]
-    nodos_tipos_aliados = [
-        {"nombre": ta} for ta in tipos_aliados if a_bool(fila[f"35_aliados_{ta}"])
-    ]
 
-    # Crear TiposFinanciacion
-    tipos_financiacion = [
-        "autogestion",
-        "estimulos_distrito",
-        "becas",
-        "convocatorias_internacionales",
-        "patrocinios",
-        "otros",
-    ]
-    nodos_tipos_financiacion = [
-        {"nombre": tf}
-        for tf in tipos_financiacion
-        if a_bool(fila[f"36_fuentes_financiacion_{tf}"])
+def crear_objetos_neo4j(df, tipos):
+    """
+    Arma los objetos de cada biblioteca campo por campo: cada nodo se construye
+    para todas las filas desde tuplas de sus propias columnas
+    (itertuples(name=None)), sin pasar por un diccionario con la fila completa.
+
+    Args:
+        df (pd.DataFrame): Datos del CSV ya convertidos con convertir_columnas.
+        tipos (list[dict]): Tipos activos de cada fila, de clasificar_tipos.
+
+    Returns:
+        list[dict]: Un objeto por fila con sus nodos y listas de tipos.
+    """
+    campos = {}
+    for campo, columnas in CAMPOS_NODOS.items():
+        claves = tuple(columnas)
+        filas = df[list(columnas.values())].itertuples(index=False, name=None)
+        campos[campo] = [dict(zip(claves, fila)) for fila in filas]
+    for grupo in GRUPOS_TIPOS:
+        campos[grupo] = [[{"nombre": t} for t in fila[grupo]] for fila in tipos]
+
+    return [
+        dict(zip(ORDEN_CAMPOS, valores))
+        for valores in zip(*(campos[campo] for campo in ORDEN_CAMPOS))
     ]
 
-    return {
-        "biblioteca": biblioteca,
-        "ubicacion": ubicacion,
-        "localidad": localidad,
-        "redes_sociales": redes_sociales,
-        "coleccion": coleccion,
-        "tipos_coleccion": nodos_tipos_coleccion,
-        "catalogo": catalogo,
-        "soporte_catalogo": soporte_catalogo,
-        "tipos_servicio": nodos_tipos_servicio,
-        "tipos_actividad": nodos_tipos_actividad,
-        "tecnologia": tecnologia,
-        "tipos_tecnologia": nodos_tipos_tecnologia,
-        "tipos_poblacion": nodos_tipos_poblacion,
-        "tipos_aliados": nodos_tipos_aliados,
-        "tipos_financiacion": nodos_tipos_financiacion,
-    }
-
-
-def cargar_datos_en_neo4j(uri, usuario, contraseña, datos):
-    logging.info("Connecting to Neo4j database...")
-    driver = GraphDatabase.driver(uri, auth=(usuario, contraseña))
 
-    try:
-        with driver.session() as sesion:
-            for i, datos_fila in enumerate(datos, 1):
+async def trabajador(driver, cola, total):
+    """
+    Toma grupos de filas de `cola` hasta vaciarla y escribe cada grupo en una
+    transacción de su propia sesión.
+    """
+    async with driver.session() as sesion:
+        while True:
+            try:
+                grupo = cola.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            for i, datos_fila in grupo:
                 logging.info(
-                    f"Processing row {i}/{len(datos)} - Biblioteca: {datos_fila['biblioteca']['nombre']}"
+                    f"Processing row {i}/{total} - Biblioteca: {datos_fila['biblioteca']['nombre']}"
+                )
+            await sesion.execute_write(crear_grafos, [datos for _, datos in grupo])
+
+
+async def crear_restricciones(uri, usuario, contraseña):
+    """
+    Crea una restricción de unicidad sobre `nombre` en ETIQUETAS_UNICAS. Sin
+    ella, los MERGE de varios trabajadores concurrentes pueden duplicar esos
+    nodos. Las restricciones son permanentes en la base de datos, y la creación
+    falla si ya hay nodos de la etiqueta con el mismo nombre.
+
+    Args:
+        uri (str): URI de la base de datos Neo4j.
+        usuario (str): Usuario de Neo4j.
+        contraseña (str): Contraseña de Neo4j.
+    """
+    async with AsyncGraphDatabase.driver(uri, auth=(usuario, contraseña)) as driver:
+        async with driver.session() as sesion:
+            for etiqueta in ETIQUETAS_UNICAS:
+                await sesion.run(
+                    f"CREATE CONSTRAINT IF NOT EXISTS FOR (n:{etiqueta}) "
+                    "REQUIRE n.nombre IS UNIQUE"
                 )
-                sesion.execute_write(crear_grafo, datos_fila)
-
-        logging.info("All data successfully loaded into Neo4j")
-    except Exception as e:
-        logging.error(f"Error loading data into Neo4j: {str(e)}")
-        raise
-    finally:
-        driver.close()
-        logging.info("Neo4j connection closed")
-
-
-def crear_grafo(tx, datos_biblioteca):
-    # Crear nodo BibliotecaComunitaria
-    tx.run(
-        Neo4jQueryManager.create_biblioteca_comunitaria(),
-        props_biblioteca=datos_biblioteca["biblioteca"],
-    )
 
-    # Crear y vincular nodo Ubicacion
-    tx.run(
-        Neo4jQueryManager.create_and_link_ubicacion(),
-        id_biblioteca=datos_biblioteca["biblioteca"]["id"],
-        props_ubicacion=datos_biblioteca["ubicacion"],
-    )
 
-    # Crear y vincular nodo Localidad
-    tx.run(
-        Neo4jQueryManager.create_and_link_localidad(),
-        id_biblioteca=datos_biblioteca["biblioteca"]["id"],
-        nombre_localidad=datos_biblioteca["localidad"]["nombre"],
+async def importar_en_neo4j(uri, usuario, contraseña, datos):
+    """
+    Crea las restricciones de unicidad y luego carga los datos con varios
+    trabajadores. Si las restricciones no se pueden crear, la carga corre con
+    un solo trabajador, para que los MERGE de nodos compartidos no se crucen.
+    """
+    concurrencia = 16
+    try:
+        await crear_restricciones(uri, usuario, contraseña)
+    except Neo4jError as e:
+        logging.warning(
+            f"Could not create uniqueness constraints, loading serially: {str(e)}"
+        )
+        concurrencia = 1
+    await cargar_datos_en_neo4j(
+        uri, usuario, contraseña, datos, concurrencia=concurrencia
     )
 
-    # Crear y vincular nodo RedesSociales
-    tx.run(
-        Neo4jQueryManager.create_and_link_redes_sociales(),
-        id_biblioteca=datos_biblioteca["biblioteca"]["id"],
-        props_redes_sociales=datos_biblioteca["redes_sociales"],
-    )
 
-    # Crear y vincular nodo Coleccion
-    tx.run(
-        Neo4jQueryManager.create_and_link_coleccion(),
-        id_biblioteca=datos_biblioteca["biblioteca"]["id"],
-        props_coleccion=datos_biblioteca["coleccion"],
+async def cargar_datos_en_neo4j(
+    uri, usuario, contraseña, datos, concurrencia=1, filas_por_transaccion=100
+):
+    """
+    Carga los datos en Neo4j con `concurrencia` trabajadores, cada uno con su
+    propia sesión, que toman grupos de filas de una cola común. Así un
+    trabajador libre sigue con el próximo grupo en lugar de esperar a los demás,
+    y la latencia de red de las escrituras se solapa.
+
+    Args:
+        uri (str): URI de la base de datos Neo4j.
+        usuario (str): Usuario de Neo4j.
+        contraseña (str): Contraseña de Neo4j.
+        datos (list[dict]): Objetos generados por crear_objetos_neo4j.
+        concurrencia (int): Número de trabajadores que escriben en paralelo.
+            Más de uno solo es seguro con las restricciones de
+            crear_restricciones ya creadas.
+        filas_por_transaccion (int): Bibliotecas escritas en cada transacción.
+    """
+    logging.info("Connecting to Neo4j database...")
+    driver = AsyncGraphDatabase.driver(
+        uri, auth=(usuario, contraseña), max_connection_pool_size=2 * concurrencia
     )
 
-    # Crear y vincular nodos TipoColeccion
-    for tc in datos_biblioteca["tipos_coleccion"]:
-        tx.run(
-            Neo4jQueryManager.create_and_link_tipo_coleccion(),
-            id_biblioteca=datos_biblioteca["biblioteca"]["id"],
-            nombre_tipo=tc["nombre"],
+    try:
+        filas = list(enumerate(datos, 1))
+        cola = asyncio.Queue()
+        for inicio in range(0, len(filas), filas_por_transaccion):
+            cola.put_nowait(filas[inicio : inicio + filas_por_transaccion])
+        await asyncio.gather(
+            *(trabajador(driver, cola, len(datos)) for _ in range(concurrencia))
         )
 
-    # Crear y vincular nodo Catalogo
-    tx.run(
-        Neo4jQueryManager.create_and_link_catalogo(),
-        id_biblioteca=datos_biblioteca["biblioteca"]["id"],
-        props_catalogo=datos_biblioteca["catalogo"],
-    )
+        logging.info("All data successfully loaded into Neo4j")
+    except Exception as e:
+        logging.error(f"Error loading data into Neo4j: {str(e)}")
+        raise
+    finally:
+        await driver.close()
+        logging.info("Neo4j connection closed")
 
-    # Crear y vincular nodo SoporteCatalogo
-    tx.run(
-        Neo4jQueryManager.create_and_link_soporte_catalogo(),
-        id_biblioteca=datos_biblioteca["biblioteca"]["id"],
-        props_soporte_catalogo=datos_biblioteca["soporte_catalogo"],
-    )
 
-    # Crear y vincular nodos TipoServicio
-    for ts in datos_biblioteca["tipos_servicio"]:
-        tx.run(
-            Neo4jQueryManager.create_and_link_tipo_servicio(),
-            id_biblioteca=datos_biblioteca["biblioteca"]["id"],
-            nombre_tipo=ts["nombre"],
-        )
+# Grupos de tipos que se enlazan como listas de nombres
+GRUPOS_NOMBRES = (
+    "tipos_coleccion",
+    "tipos_servicio",
+    "tipos_actividad",
+    "tipos_tecnologia",
+    "tipos_poblacion",
+    "tipos_aliados",
+    "tipos_financiacion",
+)
 
-    # Crear y vincular nodos TipoActividad
-    for ta in datos_biblioteca["tipos_actividad"]:
-        tx.run(
-            Neo4jQueryManager.create_and_link_tipo_actividad(),
-            id_biblioteca=datos_biblioteca["biblioteca"]["id"],
-            nombre_tipo=ta["nombre"],
-        )
 
-    # Crear y vincular nodo Tecnologia
-    tx.run(
+async def crear_grafos(tx, datos_bibliotecas):
+    """
+    Escribe un grupo de bibliotecas con una sola consulta UNWIND: por cada fila
+    crea la biblioteca y sus nodos propios, y enlaza por nombre (MERGE) la
+    localidad y los tipos compartidos entre bibliotecas.
+    """
+    filas = [
+        {
+            **{campo: datos[campo] for campo in CAMPOS_NODOS},
+            **{
+                grupo: [tipo["nombre"] for tipo in datos[grupo]]
+                for grupo in GRUPOS_NOMBRES
+            },
+        }
+        for datos in datos_bibliotecas
+    ]
+    await tx.run(
         """
-        MATCH (b:BibliotecaComunitaria {id: $id_biblioteca})
+        UNWIND $filas AS r
+        CREATE (b:BibliotecaComunitaria)
+        SET b += r.biblioteca
+        CREATE (u:Ubicacion)
+        SET u += r.ubicacion
+        CREATE (b)-[:UBICADA_EN]->(u)
+        CREATE (rs:RedesSociales)
+        SET rs += r.redes_sociales
+        CREATE (b)-[:TIENE_REDES]->(rs)
+        CREATE (c:Coleccion)
+        SET c += r.coleccion
+        CREATE (b)-[:TIENE_COLECCION]->(c)
+        CREATE (ca:Catalogo)
+        SET ca += r.catalogo
+        CREATE (b)-[:TIENE_CATALOGO]->(ca)
+        CREATE (sc:SoporteCatalogo)
+        SET sc += r.soporte_catalogo
+        CREATE (ca)-[:TIENE_SOPORTE]->(sc)
         CREATE (t:Tecnologia)
-        SET t += $props_tecnologia
+        SET t += r.tecnologia
         CREATE (b)-[:USA_TECNOLOGIA]->(t)
+        FOREACH (nombre IN CASE WHEN r.localidad.nombre IS NULL
+                THEN [] ELSE [r.localidad.nombre] END |
+            MERGE (l:Localidad {nombre: nombre})
+            CREATE (b)-[:PERTENECE_A]->(l))
+        FOREACH (nombre IN r.tipos_coleccion |
+            MERGE (tc:TipoColeccion {nombre: nombre})
+            CREATE (b)-[:CONTIENE_TIPO]->(tc))
+        FOREACH (nombre IN r.tipos_servicio |
+            MERGE (ts:TipoServicio {nombre: nombre})
+            CREATE (b)-[:OFRECE_SERVICIO]->(ts))
+        FOREACH (nombre IN r.tipos_actividad |
+            MERGE (tac:TipoActividad {nombre: nombre})
+            CREATE (b)-[:REALIZA_ACTIVIDAD]->(tac))
+        FOREACH (nombre IN r.tipos_tecnologia |
+            MERGE (tt:TipoTecnologia {nombre: nombre})
+            CREATE (b)-[:TIENE_TECNOLOGIA]->(tt))
+        FOREACH (nombre IN r.tipos_poblacion |
+            MERGE (tp:TipoPoblacion {nombre: nombre})
+            CREATE (b)-[:ATIENDE]->(tp))
+        FOREACH (nombre IN r.tipos_aliados |
+            MERGE (ta:TipoAliado {nombre: nombre})
+            CREATE (b)-[:ALIADA_CON]->(ta))
+        FOREACH (nombre IN r.tipos_financiacion |
+            MERGE (tf:TipoFinanciacion {nombre: nombre})
+            CREATE (b)-[:FINANCIADA_POR]->(tf))
     """,
-        id_biblioteca=datos_biblioteca["biblioteca"]["id"],
-        props_tecnologia=datos_biblioteca["tecnologia"],
+        filas=filas,
     )
 
-    # Crear y vincular nodos TipoTecnologia
-    for tt in datos_biblioteca["tipos_tecnologia"]:
-        tx.run(
-            """
-            MATCH (b:BibliotecaComunitaria {id: $id_biblioteca})
-            MERGE (tt:TipoTecnologia {nombre: $nombre_tipo})
-            CREATE (b)-[:TIENE_TECNOLOGIA]->(tt)
-        """,
-            id_biblioteca=datos_biblioteca["biblioteca"]["id"],
-            nombre_tipo=tt["nombre"],
-        )
-
-    # Crear y vincular nodos TipoPoblacion
-    for tp in datos_biblioteca["tipos_poblacion"]:
-        tx.run(
-            """
-            MATCH (b:BibliotecaComunitaria {id: $id_biblioteca})
-            MERGE (tp:TipoPoblacion {nombre: $nombre_tipo})
-            CREATE (b)-[:ATIENDE]->(tp)
-        """,
-            id_biblioteca=datos_biblioteca["biblioteca"]["id"],
-            nombre_tipo=tp["nombre"],
-        )
-
-    # Crear y vincular nodos TipoAliado
-    for ta in datos_biblioteca["tipos_aliados"]:
-        tx.run(
-            """
-            MATCH (b:BibliotecaComunitaria {id: $id_biblioteca})
-            MERGE (ta:TipoAliado {nombre: $nombre_tipo})
-            CREATE (b)-[:ALIADA_CON]->(ta)
-        """,
-            id_biblioteca=datos_biblioteca["biblioteca"]["id"],
-            nombre_tipo=ta["nombre"],
-        )
-
-    # Crear y vincular nodos TipoFinanciacion
-    for tf in datos_biblioteca["tipos_financiacion"]:
-        tx.run(
-            """
-            MATCH (b:BibliotecaComunitaria {id: $id_biblioteca})
-            MERGE (tf:TipoFinanciacion {nombre: $nombre_tipo})
-            CREATE (b)-[:FINANCIADA_POR]->(tf)
-        """,
-            id_biblioteca=datos_biblioteca["biblioteca"]["id"],
-            nombre_tipo=tf["nombre"],
-        )
-
 
 def main():
     import os
@@ -409,11 +501,14 @@ def main():
         csv_data = extract_csv(csv_file_path)
 
         logging.info("Processing CSV data into Neo4j objects")
-        neo4j_data = [crear_objetos_neo4j(row) for row in csv_data]
+        tipos = clasificar_tipos(csv_data)
+        neo4j_data = crear_objetos_neo4j(convertir_columnas(csv_data), tipos)
         logging.info(f"Created {len(neo4j_data)} Neo4j objects")
 
         logging.info("Starting Neo4j data import")
-        cargar_datos_en_neo4j(neo4j_uri, neo4j_user, neo4j_password, neo4j_data)
+        asyncio.run(
+            importar_en_neo4j(neo4j_uri, neo4j_user, neo4j_password, neo4j_data)
+        )
 
         logging.info("Data import completed successfully!")
 
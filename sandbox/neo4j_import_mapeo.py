@@ -3,6 +3,14 @@ import os
 from neo4j import GraphDatabase
 
 
+PREFIJOS_CATEGORIAS = (
+    "26_tipo_coleccion_",
+    "30_servicios_",
+    "31_actividades_",
+    "34_poblacion_",
+)
+
+
 def safe_float(value, default=None):
     try:
         return float(value) if value else default
@@ -23,7 +31,15 @@ def extract_csv(file_path):
         return list(csv_reader)
 
 
-def crear_objetos_neo4j(row):
+def agrupar_columnas(encabezado):
+    """Agrupa una sola vez las columnas del CSV según su prefijo de categoría."""
+    return {
+        prefijo: [columna for columna in encabezado if columna.startswith(prefijo)]
+        for prefijo in PREFIJOS_CATEGORIAS
+    }
+
+
+def crear_objetos_neo4j(row, columnas):
     biblioteca = {
         "ID": row.get("ID", ""),
         "Nombre": row.get("Nombre de la organización", ""),
@@ -59,26 +75,18 @@ def crear_objetos_neo4j(row):
     }
 
     tipos_coleccion = {
-        f"Tiene{k.capitalize()}": v
-        for k, v in row.items()
-        if k.startswith("26_tipo_coleccion_")
+        f"Tiene{k.capitalize()}": row[k] for k in columnas["26_tipo_coleccion_"]
     }
     coleccion.update(tipos_coleccion)
 
     servicios = {
-        f"Ofrece{k.capitalize()}": v
-        for k, v in row.items()
-        if k.startswith("30_servicios_")
+        f"Ofrece{k.capitalize()}": row[k] for k in columnas["30_servicios_"]
     }
     actividades = {
-        f"Realiza{k.capitalize()}": v
-        for k, v in row.items()
-        if k.startswith("31_actividades_")
+        f"Realiza{k.capitalize()}": row[k] for k in columnas["31_actividades_"]
     }
     publico = {
-        f"Atiende{k.capitalize()}": v
-        for k, v in row.items()
-        if k.startswith("34_poblacion_")
+        f"Atiende{k.capitalize()}": row[k] for k in columnas["34_poblacion_"]
     }
 
     implementacion_koha = {
@@ -205,9 +213,13 @@ def cargar_datos_en_neo4j(uri, user, password, data):
             },
         )
 
+    def create_all_nodes(tx, items):
+        for item in items:
+            create_nodes(tx, item)
+
+    # Una sola transacción para toda la carga: un único commit en lugar de uno por fila
     with driver.session() as session:
-        for item in data:
-            session.execute_write(create_nodes, item)
+        session.execute_write(create_all_nodes, data)
 
     driver.close()
 
@@ -222,7 +234,8 @@ def main():
     csv_data = extract_csv(csv_file_path)
 
     # Procesar datos del CSV en objetos para Neo4j
-    neo4j_data = [crear_objetos_neo4j(row) for row in csv_data]
+    columnas = agrupar_columnas(csv_data[0].keys() if csv_data else [])
+    neo4j_data = [crear_objetos_neo4j(row, columnas) for row in csv_data]
 
     # Cargar datos en Neo4j
     cargar_datos_en_neo4j(neo4j_uri, neo4j_user, neo4j_password, neo4j_data)